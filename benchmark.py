@@ -0,0 +1,536 @@
+# contains benchmarks for the game's hot paths, run with "python benchmark.py [name]"
+
+import os
+import sys
+import random
+import time
+import zlib
+import asyncio
+import tempfile
+import subprocess
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy") # benchmarks never need a real window
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+import numpy as np
+import environment as env
+import game_settings as gs
+import world_file
+import generation
+import simulation
+import controls
+import startup
+import server
+import network
+import collision
+import entities
+from dirty_rects import Dirty_Rects
+from player import Player
+from blocks import AIR, STONE, COAL, IRON, DIAMOND, SAND, WATER
+
+BLOCK_DIMENSIONS = 10
+
+
+def make_environment(world_dimensions, seed=0, screen_size=None, environment_class=env.Environment, workers=1):
+    '''creates and generates an environment of the given (height, width) drawing onto an off-screen surface.
+    The surface covers the whole world unless a (width, height) screen_size is given'''
+    game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, world_dimensions, gs.BLOCK_COLORS, seed=seed,
+                                     generation_workers=workers)
+    if screen_size is None:
+        screen_size = (world_dimensions[1] * BLOCK_DIMENSIONS, world_dimensions[0] * BLOCK_DIMENSIONS)
+    screen = pygame.Surface(screen_size)
+    environment = environment_class(screen, game_settings)
+    environment.create_environment()
+    return environment
+
+
+def time_frames(draw, frames):
+    '''returns the mean time (ms) of calling draw() once per frame'''
+    start = time.perf_counter()
+    for frame in range(frames):
+        draw(frame)
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def bench_render(sizes=((80, 140), (160, 280), (320, 560)), frames=30):
+    '''compares the per-block renderer against the cached chunk renderer at several world sizes'''
+    print("%-12s %14s %14s %18s" % ("world", "blocks (ms)", "chunks (ms)", "chunks+mine (ms)"))
+    for world_dimensions in sizes:
+        environment = make_environment(world_dimensions)
+        rows, columns = world_dimensions
+
+        def mine(frame):
+            '''removes one block per frame so a chunk has to be re-rendered'''
+            row = rows - 1 - (frame // columns) % rows
+            environment.set_block(row, frame % columns, 0)
+            environment.draw_environment()
+
+        blocks = time_frames(lambda frame: environment.draw_environment_blocks(), frames)
+        environment.draw_environment() # fill the chunk cache before timing it
+        chunks = time_frames(lambda frame: environment.draw_environment(), frames)
+        mining = time_frames(mine, frames)
+        print("%-12s %14.3f %14.3f %18.3f" % ("%dx%d" % world_dimensions, blocks, chunks, mining))
+
+
+def bench_generate(sizes=((80, 140), (800, 1400), (1000, 4000))):
+    '''times world generation and reports the size of the block grid at several world sizes'''
+    print("%-12s %16s %14s" % ("world", "generate (ms)", "grid (KiB)"))
+    for world_dimensions in sizes:
+        start = time.perf_counter()
+        environment = make_environment(world_dimensions, screen_size=(1400, 800))
+        elapsed = (time.perf_counter() - start) * 1000
+        print("%-12s %16.3f %14.1f" % ("%dx%d" % world_dimensions, elapsed, environment.num_env.nbytes / 1024))
+
+
+def bench_terrain(sizes=((120, 2000), (1000, 4000)), chunk_width=32):
+    '''compares the random walk generator against the noise generator, checking the noise generator gives the
+    same world generated in one band as chunk by chunk'''
+    print("%-12s %-8s %14s %10s %10s %8s" % ("world", "terrain", "generate (ms)", "caves %", "ore blocks", "same"))
+    for rows, columns in sizes:
+        chunk_count = -(-columns // chunk_width) # ceiling division
+        for generator in ("walk", "noise"):
+            terrain = gs.Terrain_Settings(generator=generator)
+            start = time.perf_counter()
+            blocks, surface_values = generation.generate_band(0, 0, chunk_count, chunk_width, rows, terrain)
+            elapsed = (time.perf_counter() - start) * 1000
+            underground = np.arange(rows)[:, None] > surface_values
+            caves = (blocks[underground] == AIR).mean() * 100
+            ores = np.isin(blocks, (COAL, IRON, DIAMOND)).sum()
+            chunks = [generation.generate_chunk(0, chunk_x, chunk_width, rows, terrain)[0]
+                      for chunk_x in range(min(chunk_count, 8))]
+            same = np.array_equal(np.hstack(chunks), blocks[:, :len(chunks) * chunk_width])
+            print("%-12s %-8s %14.3f %10.2f %10d %8s" % ("%dx%d" % (rows, columns), generator, elapsed, caves, ores,
+                                                         same))
+
+
+def bench_lighting(sizes=((120, 2000), (1000, 4000), (1000, 20000)), edits=200):
+    '''compares recalculating the whole light map against the flood fill update after mining a block, at several
+    world sizes (the update should cost the same however big the world is)'''
+    print("%-12s %14s %16s %16s" % ("world", "full (ms)", "update (ms)", "blocks visited"))
+    for world_dimensions in sizes:
+        environment = make_environment(world_dimensions, screen_size=(1400, 800))
+        start = time.perf_counter()
+        environment.light_blocks(environment.num_env)
+        full = (time.perf_counter() - start) * 1000
+        rng = random.Random(0)
+        visited = 0
+        start = time.perf_counter()
+        for edit in range(edits): # mine just under the surface, where the light changes
+            column = rng.randrange(environment.columns)
+            row = min(int(environment.get_surface(column)) + rng.randrange(4), environment.rows - 1)
+            solid = environment.blocks.solid[environment.get_block(row, column)]
+            environment.set_block(row, column, AIR if solid else STONE)
+            visited += environment.last_light_update
+        update = (time.perf_counter() - start) * 1000 / edits
+        print("%-12s %14.3f %16.3f %16.0f" % ("%dx%d" % world_dimensions, full, update, visited / edits))
+
+
+def bench_blocks(counts=(1000, 5000, 20000), world_dimensions=(300, 1000), max_ticks=2000):
+    '''drops thousands of sand and water blocks from the sky and times the block update ticks until they settle
+    (with and without relighting), then times a tick of the settled world (which should cost nothing)'''
+    print("%-8s %-6s %10s %12s %12s %14s %10s %12s" % ("blocks", "light", "ticks", "tick (ms)", "max (ms)",
+                                                       "updates/tick", "pending", "idle (ms)"))
+    for count, lighting in [(count, lighting) for count in counts for lighting in (True, False)]:
+        game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, world_dimensions, gs.BLOCK_COLORS, seed=0,
+                                         lighting=lighting)
+        environment = env.Environment(pygame.Surface((1400, 800)), game_settings)
+        environment.create_environment()
+        scheduler = environment.block_updates
+        rows = -(-count // environment.columns) # ceiling division
+        tags = np.where(np.arange(rows * environment.columns) % 3 == 0, WATER, SAND)[:count]
+        environment.num_env[5:5 + rows].reshape(-1)[:count] = tags # a layer of blocks hanging in the sky
+        environment.refresh()
+        for row in range(5, 5 + rows):
+            for column in range(environment.columns):
+                scheduler.wake(row, column)
+        times = []
+        updates = 0
+        while scheduler.pending and len(times) < max_ticks:
+            start = time.perf_counter()
+            scheduler.tick()
+            times.append((time.perf_counter() - start) * 1000)
+            updates += scheduler.last_updates
+        start = time.perf_counter()
+        for tick in range(100):
+            environment.block_updates.tick()
+        idle = (time.perf_counter() - start) * 1000 / 100
+        print("%-8d %-6s %10d %12.3f %12.3f %14.0f %10d %12.4f" % (count, lighting, len(times), sum(times) / len(times),
+                                                                   max(times), updates / len(times),
+                                                                   len(scheduler.pending), idle))
+
+
+def bench_parallel(sizes=((120, 2000), (200, 20000), (400, 100000)), worker_counts=(1, 2, 4, 8)):
+    '''times generating worlds of several widths with different numbers of worker processes'''
+    print("%-12s" % "world" + "".join("%14s" % ("%d worker(s)" % workers) for workers in worker_counts))
+    for world_dimensions in sizes:
+        times = []
+        serial = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            environment = make_environment(world_dimensions, screen_size=(1400, 800), workers=workers)
+            times.append((time.perf_counter() - start) * 1000)
+            if serial is None:
+                serial = environment.num_env
+            elif not (environment.num_env == serial).all():
+                raise AssertionError("parallel generation differs from serial generation")
+        print("%-12s" % ("%dx%d" % world_dimensions) + "".join("%11.1f ms" % ms for ms in times))
+
+
+def bench_save(sizes=((120, 2000), (400, 20000), (1000, 100000))):
+    '''times saving and loading finite worlds, checking that every load gives back the saved world'''
+    print("%-12s %12s %12s %12s %14s %16s" % ("world", "file (KiB)", "save (ms)", "load (ms)", "save (MB/s)",
+                                             "endless open (ms)"))
+    path = os.path.join(tempfile.mkdtemp(), "bench.sav")
+    for world_dimensions in sizes:
+        environment = make_environment(world_dimensions, screen_size=(1400, 800))
+        player = Player(environment.screen)
+        player.rect.topleft, player.yvel, player.inventory = (120, 40), 4.5, {"DIRT": 3, "DIAMOND": 1}
+        start = time.perf_counter()
+        world_file.save_world(path, environment, player)
+        save = time.perf_counter() - start
+        size = os.path.getsize(path) / 1024
+        start = time.perf_counter()
+        loaded, loaded_player = world_file.load_world(path, environment.screen, environment.game_settings)
+        load = time.perf_counter() - start
+        if not ((loaded.num_env == environment.num_env).all() and
+                (loaded.surface_values == environment.surface_values).all() and
+                loaded_player.rect == player.rect and loaded_player.yvel == player.yvel and
+                loaded_player.xvel == player.xvel and loaded_player.inventory == player.inventory):
+            raise AssertionError("loaded world differs from the saved world")
+        loaded_player.right = True # the loaded player has to be able to move
+        loaded_player.update(loaded)
+
+        # an endless world with every chunk modified only reads the chunks around the player when opened
+        endless = make_environment(world_dimensions, screen_size=(1400, 800), environment_class=env.Chunked_Environment)
+        for chunk_x in range(-(-world_dimensions[1] // endless.chunk_width)):
+            endless.set_block(0, chunk_x * endless.chunk_width, 1)
+        world_file.save_world(path, endless, player)
+        start = time.perf_counter()
+        reopened, reopened_player = world_file.load_world(path, endless.screen, endless.game_settings)
+        reopen = (time.perf_counter() - start) * 1000
+        if not (reopened.get_region(0, 0, world_dimensions[0], world_dimensions[1]) ==
+                endless.get_region(0, 0, world_dimensions[0], world_dimensions[1])).all():
+            raise AssertionError("loaded endless world differs from the saved world")
+        world_file.save_world(path, reopened, reopened_player) # saving over the file the world is reading from
+        if not (reopened.get_region(0, 0, world_dimensions[0], world_dimensions[1]) ==
+                endless.get_region(0, 0, world_dimensions[0], world_dimensions[1])).all():
+            raise AssertionError("resaved endless world differs from the saved world")
+        reopened.world_file.close()
+        print("%-12s %12.1f %12.3f %12.3f %14.1f %16.3f" % ("%dx%d" % world_dimensions, size,
+                                                           save * 1000, load * 1000,
+                                                           environment.num_env.nbytes / save / 1e6, reopen))
+    os.remove(path)
+
+
+def bench_simulation(sizes=((120, 2000), (120, 20000)), ticks=5000):
+    '''measures how many ticks per second a headless simulation runs a scripted walk / jump / mine session at'''
+    print("%-12s %-10s %14s %12s" % ("world", "kind", "ticks/s", "mined"))
+    actions = [(0, "right", ())]
+    for tick in range(0, ticks, 15):
+        actions += [(tick, "jump", ()), (tick + 1, "break", ()), (tick + 7, "stop_break", ())]
+    for world_dimensions in sizes:
+        for kind, environment_class in (("finite", env.Environment), ("endless", env.Chunked_Environment)):
+            game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, world_dimensions, gs.BLOCK_COLORS, seed=0)
+            environment = simulation.make_headless_environment(game_settings, environment_class=environment_class)
+            sim = simulation.Simulation(environment, actions=actions)
+            player = sim.player
+            start = time.perf_counter()
+            for tick in range(ticks):
+                player.aim = (player.rect.right + BLOCK_DIMENSIONS, player.rect.centery) # mine the block ahead
+                sim.step()
+            rate = ticks / (time.perf_counter() - start)
+            print("%-12s %-10s %14.0f %12d" % ("%dx%d" % world_dimensions, kind, rate, sum(player.inventory.values())))
+
+
+def bench_replay(world_dimensions=(120, 2000), repeats=5):
+    '''replays the session recorded at TERRARIA_REPLAY (or a scripted one) headless, from the same world the game
+    replays it in, and checks every run ends in the same state'''
+    path = os.environ.get("TERRARIA_REPLAY")
+    if path:
+        actions = controls.read_actions(path)
+    else:
+        actions = [(0, "right", ())]
+        for tick in range(0, 3000, 15):
+            actions += [(tick, "jump", ()), (tick + 1, "aim", (tick // 3 + 700, 300)), (tick + 1, "break", ()),
+                        (tick + 7, "stop_break", ())]
+    ticks = max(action[0] for action in actions) + 1
+    print("%-12s %10s %14s %12s %10s" % ("world", "ticks", "ticks/s", "position", "same"))
+    results = set()
+    for repeat in range(repeats):
+        game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, world_dimensions, gs.BLOCK_COLORS, seed=0)
+        environment = simulation.make_headless_environment(game_settings, environment_class=env.Chunked_Environment)
+        sim = simulation.Simulation(environment, actions=actions)
+        rate = sim.run(ticks)
+        results.add((sim.player.rect.topleft, tuple(sorted(sim.player.inventory.items()))))
+        print("%-12s %10d %14.0f %12s %10s" % ("%dx%d" % world_dimensions, ticks, rate, sim.player.rect.topleft,
+                                              len(results) == 1))
+
+
+def bench_collision(rows=120, queries=100000, entity_counts=(1, 100, 1000), ticks=100):
+    '''compares a list-building column scan with a bitmask query, then times moving many rects through the world'''
+    environment = make_environment((rows, 2000), screen_size=(1400, 800))
+    columns = [(i * 7) % 2000 for i in range(queries)]
+    start = time.perf_counter()
+    for column in columns:
+        any([environment.num_env[row][column] for row in range(20, 40)])
+    scan = (time.perf_counter() - start) * 1e9 / queries
+    start = time.perf_counter()
+    for column in columns:
+        collision.any_solid(environment, 20, 40, column)
+    mask = (time.perf_counter() - start) * 1e9 / queries
+    print("rows 20..40 of a column: list scan %.0f ns, bitmask %.0f ns" % (scan, mask))
+    print("%-10s %14s %18s" % ("entities", "tick (ms)", "per entity (us)"))
+    for count in entity_counts:
+        rects = [pygame.Rect((i * 37) % 19000, 0, 8, 20) for i in range(count)]
+        start = time.perf_counter()
+        for tick in range(ticks):
+            dx = 3 if tick % 40 < 20 else -3
+            for rect in rects:
+                collision.move(environment, rect, dx, 9)
+        tick_ms = (time.perf_counter() - start) * 1000 / ticks
+        print("%-10d %14.3f %18.3f" % (count, tick_ms, tick_ms * 1000 / count))
+
+
+def bench_entities(entity_counts=(10, 100, 1000, 5000), ticks=50):
+    '''times one batched entity update against the number of mobs and items in the world'''
+    environment = make_environment((120, 2000), screen_size=(1400, 800))
+    print("%-10s %14s %18s" % ("entities", "tick (ms)", "per entity (us)"))
+    for count in entity_counts:
+        store = entities.Entity_Store()
+        for i in range(count):
+            if i % 2:
+                store.spawn(entities.MOB, (i * 37) % 19000, 0, direction=1 if i % 4 == 1 else -1)
+            else:
+                store.spawn(entities.ITEM, (i * 37) % 19000, 0, tag=2)
+        start = time.perf_counter()
+        for tick in range(ticks):
+            store.update(environment)
+        tick_ms = (time.perf_counter() - start) * 1000 / ticks
+        print("%-10d %14.3f %18.3f" % (count, tick_ms, tick_ms * 1000 / count))
+
+
+def bench_inventory(frames=200):
+    '''compares looking up fonts and redrawing the inventory every frame with the cached inventory panel'''
+    environment = make_environment((80, 140), screen_size=(1400, 800))
+    player = Player(environment.screen)
+    player.inventory = {"DIRT": 12, "STONE": 40, "COAL": 3, "IRON": 2, "DIAMOND": 1, "WOOD": 9, "LEAF": 20}
+
+    def uncached(frame):
+        '''the inventory as it used to be drawn: fonts looked up and every string rendered each frame'''
+        pygame.font.init() # (fonts.get_font would do this for the cached version)
+        font = pygame.font.SysFont("Arial", 40)
+        environment.screen.blit(font.render("INVENTORY", False, (230, 230, 230)), (600, 250))
+        pygame.draw.rect(environment.screen, (255, 255, 255), player.inv_screen_bounds)
+        font = pygame.font.SysFont("Arial", 20)
+        for i, (name, value) in enumerate(player.inventory.items()):
+            pygame.draw.rect(environment.screen, gs.BLOCK_COLORS[name], (510 + i * 50, 310, 40, 40))
+            environment.screen.blit(font.render(str(value), False, (0, 0, 0)), (540 + i * 50, 340))
+
+    old = time_frames(uncached, frames)
+    redraw = time_frames(lambda frame: player.display_inventory(environment, True), frames)
+    idle = time_frames(lambda frame: player.display_inventory(environment), frames)
+    print("uncached %.3f ms, cached redraw %.3f ms, cached unchanged %.4f ms per frame" % (old, redraw, idle))
+
+
+def bench_dirty(frames=300, mob_count=20):
+    '''compares redrawing and flipping the whole window with redrawing and updating only the changed rects,
+    while the camera stands still and a few mobs walk around'''
+    window = startup.init_display((1400, 800))
+    environment = make_environment((80, 140), screen_size=(1400, 800))
+    environment.screen = window
+    environment.renderer.invalidate() # render the chunks in the display's format
+    background = gs.BLOCK_COLORS["BACKGROUND"]
+    for dirty in (False, True):
+        store = entities.Entity_Store()
+        for i in range(mob_count):
+            store.spawn(entities.MOB, 100 + i * 60, 0, direction=1 if i % 2 else -1)
+        display_updates = Dirty_Rects(window.get_rect())
+        last_drawn = []
+        start = time.perf_counter()
+        for frame in range(frames):
+            store.update(environment)
+            if not dirty:
+                display_updates.mark_full()
+            for rect in last_drawn:
+                display_updates.add(rect)
+            if display_updates.is_full():
+                window.fill(background)
+                environment.draw_environment()
+            else:
+                for rect in display_updates.rects:
+                    window.set_clip(rect)
+                    window.fill(background)
+                    environment.draw_environment(rect)
+                window.set_clip(None)
+            last_drawn = store.draw(window, environment, environment.camera)
+            for rect in last_drawn:
+                display_updates.add(rect)
+            display_updates.present()
+        frame_ms = (time.perf_counter() - start) * 1000 / frames
+        print("%-12s %.3f ms per frame" % ("dirty rects" if dirty else "full flip", frame_ms))
+
+
+def bench_startup(sizes=((120, 2000), (120, 20000), (120, 200000))):
+    '''compares the start up time of a fully generated world against an endless chunked world'''
+    print("%-12s %14s %14s %18s" % ("world", "full (ms)", "chunked (ms)", "chunked run (ms)"))
+    for world_dimensions in sizes:
+        start = time.perf_counter()
+        make_environment(world_dimensions, screen_size=(1400, 800))
+        full = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        environment = make_environment(world_dimensions, screen_size=(1400, 800),
+                                       environment_class=env.Chunked_Environment)
+        chunked = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        for x in range(0, world_dimensions[1] * BLOCK_DIMENSIONS, BLOCK_DIMENSIONS * 8): # run across the world
+            environment.load_around(x)
+        run = (time.perf_counter() - start) * 1000
+        print("%-12s %14.3f %14.3f %18.3f" % ("%dx%d" % world_dimensions, full, chunked, run))
+
+
+async def send_hostile_messages(port):
+    '''connects to the server once for each kind of malformed message and waits for it to drop the connection:
+    a header claiming a 4 GiB payload, a small payload that decompresses to far more than is allowed and a corrupt
+    compressed one'''
+    hello = network.encode_message(network.HELLO, b"bot")
+    bomb = zlib.compress(b"a" * 30000, 9) # 53 bytes
+    messages = [network.HEADER.pack(network.HELLO, 0, 2 ** 32 - 1),
+                hello + network.HEADER.pack(network.INPUT, network.COMPRESSED, len(bomb)) + bomb,
+                hello + network.HEADER.pack(network.INPUT, network.COMPRESSED, 8) + b"corrupt!"]
+    for message in messages:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(message)
+        while await network.read_message(reader) is not None: # (the WELCOME, if it got that far)
+            pass
+        writer.close()
+
+
+async def run_server_load(count, ticks, tick_rate, spacing=0):
+    '''runs a server with count bot clients on loopback for the given number of ticks, the bots' players starting
+    spacing chunks apart. Each bot walks back and forth, jumping and mining the block ahead of its feet, like bench_simulation's player,
+    and now and then sends input with the wrong arguments, which the server has to ignore.
+    Returns the server, the (snapshot bytes, update bytes) sent to each client and whether every client's chunks
+    ended up matching the server's'''
+    game_server = server.Game_Server(server.make_server_environment(seed=0), tick_rate)
+    port = await game_server.start()
+    clients = [network.Game_Client("bot%d" % index) for index in range(count)]
+    for index, client in enumerate(clients):
+        await client.connect("127.0.0.1", port)
+        player = game_server.clients[client.player_id].player
+        player.rect.x = index * spacing * game_server.environment.chunk_width * BLOCK_DIMENSIONS
+    receivers = [asyncio.create_task(client.receive()) for client in clients]
+    await send_hostile_messages(port)
+
+    async def bot(index, client):
+        direction = 1
+        for tick in range(ticks):
+            if tick % 60 == 0: # turn around every 3 seconds, half the bots starting each way
+                direction = 1 if (tick // 60 + index) % 2 == 0 else -1
+                client.send_action("right" if direction > 0 else "left")
+                client.send_action("stop_left" if direction > 0 else "stop_right")
+                client.send_action("break")
+            if tick % 10 == index % 10:
+                client.send_action("jump")
+            if tick % 50 == index % 50: # malformed input
+                client.send_action("aim")
+                client.send_action("left", (5,))
+            x, y = client.positions.get(client.player_id, (0, 0))
+            client.send_action("aim", (x + 4 + direction * BLOCK_DIMENSIONS, y + 25))
+            await asyncio.sleep(1 / tick_rate)
+
+    bots = [asyncio.create_task(bot(index, client)) for index, client in enumerate(clients)]
+    await game_server.run(ticks)
+    await asyncio.gather(*bots)
+    await asyncio.sleep(0.5) # let the last messages arrive
+    environment = game_server.environment
+    width = environment.chunk_width
+    synced = all(np.array_equal(blocks, environment.get_region(0, chunk_x * width, environment.rows,
+                                                                (chunk_x + 1) * width))
+                 for client in clients for chunk_x, blocks in client.chunks.items())
+    sent = [(connection.snapshot_bytes, connection.update_bytes) for connection in game_server.clients.values()]
+    await game_server.close()
+    for client in clients:
+        await client.close()
+    await asyncio.gather(*receivers)
+    return game_server, sent, synced
+
+
+def bench_server(client_counts=(1, 4, 16, 64), ticks=100, tick_rate=20, spacings=(0, 8)):
+    '''load tests the multiplayer server with more and more loopback bot clients, all starting together and then
+    spread out (so each one keeps its own chunks loaded), measuring its tick time and the bytes it sends
+    (snapshots of newly reached chunks, then block changes and player positions). Spread out bots generate all
+    their chunks in the first tick, which is what their p99 shows'''
+    print("%-8s %8s %10s %10s %14s %16s %16s %8s" % ("clients", "spacing", "p50 (ms)", "p99 (ms)", "out (KiB/s)",
+                                                     "snapshot (KiB)", "updates (B/tick)", "synced"))
+    for spacing in spacings:
+        for count in client_counts:
+            game_server, sent, synced = asyncio.run(run_server_load(count, ticks, tick_rate, spacing))
+            total = sum(snapshot + updates for snapshot, updates in sent)
+            print("%-8d %8d %10.2f %10.2f %14.1f %16.1f %16.1f %8s" % (
+                count, spacing, game_server.profiler.percentile("frame", 50),
+                game_server.profiler.percentile("frame", 99), total / 1024 / (ticks / tick_rate),
+                sum(snapshot for snapshot, updates in sent) / 1024 / count,
+                sum(updates for snapshot, updates in sent) / ticks / count, synced))
+
+
+def bench_launch(modules=("environment", "player", "world_file", "simulation", "server", "benchmark"), repeats=3):
+    '''times importing the game's modules in a fresh interpreter, checking none of them starts the display or sound,
+    then times launching the game up to its first frame and until its world is ready'''
+    directory = os.path.dirname(os.path.abspath(__file__))
+    check = ("import time; start = time.perf_counter(); import %s; elapsed = time.perf_counter() - start; "
+             "import pygame; print(elapsed * 1000, pygame.display.get_init(), bool(pygame.mixer.get_init()))")
+    print("%-14s %12s %10s %10s" % ("module", "import (ms)", "display", "sound"))
+    for module in modules:
+        output = subprocess.run([sys.executable, "-c", check % module], cwd=directory, capture_output=True,
+                                text=True, check=True).stdout.split()
+        print("%-14s %12.1f %10s %10s" % (module, float(output[-3]), output[-2], output[-1]))
+
+    # a replay of a single tick makes the game quit (without saving) right after its first game frame
+    replay = os.path.join(tempfile.mkdtemp(), "launch.txt")
+    controls.write_actions(replay, [(0, "stop_left", ())])
+    launch_env = dict(os.environ, TERRARIA_REPLAY=replay, TERRARIA_STARTUP="1")
+    print("%-14s %16s %16s %14s" % ("launch", "first frame (ms)", "world ready (ms)", "total (ms)"))
+    for repeat in range(repeats):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "terraria_main.py"], cwd=directory, env=launch_env,
+                                capture_output=True, text=True, check=True).stdout.split()
+        total = (time.perf_counter() - start) * 1000 # including starting the interpreter and quitting
+        first_frame, world_ready = float(output[output.index("frame") + 1]), float(output[output.index("ready") + 1])
+        print("%-14d %16.1f %16.1f %14.1f" % (repeat, first_frame, world_ready, total))
+    os.remove(replay)
+
+
+def bench_camera(sizes=((80, 140), (120, 2000), (400, 16000)), frames=120):
+    '''times drawing a 1400x800 view scrolling across worlds of several sizes'''
+    print("%-12s %14s %14s" % ("world", "frame (ms)", "cached chunks"))
+    for world_dimensions in sizes:
+        environment = make_environment(world_dimensions, screen_size=(1400, 800))
+        target = pygame.Rect(0, 0, 8, 20)
+        target.centery = environment.get_world_rect().centery
+
+        def scroll(frame):
+            '''moves the camera right a block at a time, as if following a running player'''
+            target.centerx = frame * BLOCK_DIMENSIONS
+            environment.camera.follow(target)
+            environment.draw_environment()
+
+        frame_ms = time_frames(scroll, frames)
+        print("%-12s %14.3f %14d" % ("%dx%d" % world_dimensions, frame_ms, len(environment.renderer.surfaces)))
+
+
+BENCHMARKS = {"render": bench_render, "generate": bench_generate, "terrain": bench_terrain,
+              "lighting": bench_lighting, "camera": bench_camera, "startup": bench_startup,
+              "launch": bench_launch,
+              "parallel": bench_parallel, "save": bench_save,
+              "simulation": bench_simulation, "collision": bench_collision,
+              "entities": bench_entities, "inventory": bench_inventory,
+              "dirty": bench_dirty, "replay": bench_replay, "blocks": bench_blocks,
+              "server": bench_server}
+
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        print("== %s ==" % name)
+        BENCHMARKS[name]()
@@ -0,0 +1,105 @@
+# contains the Block_Scheduler class, which moves falling blocks and flowing fluids a bounded number at a time
+#
+# a block is only looked at when it or one of its neighbours changes (it is "woken"), so the parts of the world
+# that are at rest cost nothing. Woken blocks wait in an insertion ordered set and each tick updates at most
+# max_updates of them, the rest are left for the following ticks
+
+from itertools import islice
+from blocks import AIR, STATIC, FALLS, FLOWS
+
+RELIGHT_SIZE = 64 # blocks moved in the same RELIGHT_SIZE square are relit together at the end of a tick
+
+
+class Block_Scheduler():
+    '''A class to keep the set of blocks that might move and update them a few at a time each tick'''
+
+    def __init__(self, environment, max_updates=512):
+        self.environment = environment
+        self.max_updates = max_updates # the most blocks updated in one tick
+        self.pending = {} # {(row, column) : None}, the woken blocks in the order they were woken
+        self.moved = [] # (row, column) of every block changed this tick, relit together at the end of it
+        self.ticks = 0
+        self.last_updates = 0 # the number of blocks updated by the last tick
+        self.last_moves = 0 # the number of blocks that moved in the last tick
+
+    def wake(self, row, column):
+        '''adds the block at (row, column) to the pending set if it is a block that can move'''
+        environment = self.environment
+        if 0 <= row < environment.rows and 0 <= column < environment.columns and \
+                environment.blocks.physics[environment.get_block(row, column)] != STATIC:
+            self.pending[(row, column)] = None
+
+    def wake_around(self, row, column):
+        '''wakes the block at (row, column) and the 8 blocks around it, after it changed'''
+        for r in range(row - 1, row + 2):
+            for c in range(column - 1, column + 2):
+                self.wake(r, c)
+
+    def is_empty(self, row, column, fluid=False):
+        '''returns True if a block could move into (row, column): air, or a fluid if fluid is True.
+        The bottom, left and right of the world are never empty'''
+        environment = self.environment
+        if not (0 <= row < environment.rows and 0 <= column < environment.columns):
+            return False
+        tag = environment.get_block(row, column)
+        return tag == AIR or (fluid and environment.blocks.physics[tag] == FLOWS)
+
+    def move(self, row, column, to_row, to_column):
+        '''swaps the block at (row, column) with the one at (to_row, to_column), waking the blocks around both'''
+        environment = self.environment
+        tag, other = environment.get_block(row, column), environment.get_block(to_row, to_column)
+        environment.set_block(to_row, to_column, tag, relight=False)
+        environment.set_block(row, column, other, relight=False)
+        self.moved += [(row, column), (to_row, to_column)]
+        self.last_moves += 1
+
+    def update(self, row, column):
+        '''moves the block at (row, column) one step if it can.
+        Falling blocks drop into air or sink through fluids. Fluids drop, slide down off ledges, and spread sideways
+        when there is fluid above pressing down on them'''
+        environment = self.environment
+        physics = environment.blocks.physics[environment.get_block(row, column)]
+        if physics == FALLS:
+            if self.is_empty(row + 1, column, fluid=True):
+                self.move(row, column, row + 1, column)
+        elif physics == FLOWS:
+            if self.is_empty(row + 1, column):
+                self.move(row, column, row + 1, column)
+                return
+            first = 1 if (self.ticks + column) % 2 else -1 # alternate sides so fluids spread evenly
+            for side in (first, -first):
+                if self.is_empty(row, column + side) and self.is_empty(row + 1, column + side):
+                    self.move(row, column, row + 1, column + side)
+                    return
+            if row > 0 and environment.blocks.physics[environment.get_block(row - 1, column)] == FLOWS:
+                for side in (first, -first):
+                    if self.is_empty(row, column + side):
+                        self.move(row, column, row, column + side)
+                        return
+
+    def tick(self):
+        '''updates up to max_updates woken blocks, then relights around the ones that moved'''
+        batch = list(islice(self.pending, self.max_updates))
+        for key in batch:
+            del self.pending[key]
+        self.last_moves = 0
+        for row, column in batch:
+            self.update(row, column)
+        self.last_updates = len(batch)
+        self.ticks += 1
+        if self.moved:
+            self.relight()
+
+    def relight(self):
+        '''updates the light once for each RELIGHT_SIZE square holding blocks moved this tick'''
+        areas = {} # {(square row, square column) : [top row, left column, bottom row, right column]}
+        for row, column in self.moved:
+            area = areas.get((row // RELIGHT_SIZE, column // RELIGHT_SIZE))
+            if area is None:
+                areas[(row // RELIGHT_SIZE, column // RELIGHT_SIZE)] = [row, column, row + 1, column + 1]
+            else:
+                area[0], area[1] = min(area[0], row), min(area[1], column)
+                area[2], area[3] = max(area[2], row + 1), max(area[3], column + 1)
+        self.moved = []
+        for top_row, left_col, bottom_row, right_col in areas.values():
+            self.environment.relight(top_row, left_col, bottom_row, right_col)
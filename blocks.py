@@ -0,0 +1,85 @@
+# contains the Block_Registry class, which holds the properties of every type of block in id-indexed tables
+
+import numpy as np
+
+AIR = 0 # the tags (ids) of the built-in blocks, as stored in num_env
+DIRT = 1
+STONE = 2
+COAL = 3
+IRON = 4
+DIAMOND = 5
+WOOD = 6
+LEAF = 7
+SAND = 8
+WATER = 9
+
+STATIC = 0 # how blocks move once the world is generated, see block_updates.py
+FALLS = 1 # falls into air and sinks through fluids below it
+FLOWS = 2 # a fluid, falls and spreads out sideways
+
+SKY_COLOR = (0, 150, 230) # the color of air, shown as the background
+
+
+class Block_Registry():
+    '''A class to hold the properties of every block tag in dense arrays indexed by the tag,
+    so looking up any property of a block is a single index (or one NumPy gather for a whole region)'''
+
+    size = 256 # num_env is uint8, so tags go from 0 to 255
+
+    def __init__(self):
+        self.names = [None] * Block_Registry.size # tag : "BLOCK_NAME"
+        self.tags = {} # {"BLOCK_NAME" : tag}
+        self.colors = np.zeros((Block_Registry.size, 3), dtype=np.uint8) # tag : (R, G, B)
+        self.color_list = [None] * Block_Registry.size # the same colors as tuples, None for air / unknown tags
+        self.solid = np.zeros(Block_Registry.size, dtype=bool) # tag : True if entities collide with it
+        self.hardness = np.zeros(Block_Registry.size, dtype=np.uint8) # tag : number of ticks it takes to mine
+        self.drops = np.zeros(Block_Registry.size, dtype=np.uint8) # tag : the tag added to the inventory when mined
+        self.falloff = np.ones(Block_Registry.size, dtype=np.uint8) # tag : how much light is lost passing through it
+        self.physics = np.zeros(Block_Registry.size, dtype=np.uint8) # tag : STATIC, FALLS or FLOWS
+
+    def register(self, tag, name, color, solid=True, hardness=1, drop=None, falloff=None, physics=STATIC):
+        '''adds a type of block, drop is the tag it gives when mined (itself if None).
+        falloff defaults to 1 for blocks light passes through and 3 for solid blocks'''
+        if self.names[tag] is not None:
+            raise ValueError("block tag %d is already registered as %s" % (tag, self.names[tag]))
+        self.names[tag] = name
+        self.tags[name] = tag
+        self.colors[tag] = color
+        if tag != AIR:
+            self.color_list[tag] = tuple(color)
+        self.solid[tag] = solid
+        self.hardness[tag] = hardness
+        self.drops[tag] = tag if drop is None else drop
+        if falloff is None:
+            falloff = 3 if solid else 1
+        self.falloff[tag] = falloff
+        self.physics[tag] = physics
+
+    def get_palette(self, background):
+        '''returns a copy of the color table with every unregistered tag (and air) drawn as the background'''
+        palette = self.colors.copy()
+        for tag, name in enumerate(self.names):
+            if name is None or tag == AIR:
+                palette[tag] = background
+        return palette
+
+    def get_color_dict(self):
+        '''returns a dictionary {"BLOCK_NAME" : (R, G, B)} of every block, with air as "BACKGROUND"'''
+        colors = {"BACKGROUND": tuple(self.colors[AIR].tolist())}
+        for tag, name in enumerate(self.names):
+            if name is not None and tag != AIR:
+                colors[name] = self.color_list[tag]
+        return colors
+
+
+BLOCKS = Block_Registry() # the registry of the game's blocks, new blocks are added with BLOCKS.register
+BLOCKS.register(AIR, "AIR", SKY_COLOR, solid=False, hardness=0)
+BLOCKS.register(DIRT, "DIRT", (165, 42, 42), hardness=1)
+BLOCKS.register(STONE, "STONE", (128, 128, 128), hardness=2)
+BLOCKS.register(COAL, "COAL", (0, 0, 0), hardness=2)
+BLOCKS.register(IRON, "IRON", (128, 0, 0), hardness=3)
+BLOCKS.register(DIAMOND, "DIAMOND", (0, 255, 255), hardness=4)
+BLOCKS.register(WOOD, "WOOD", (181, 101, 29), hardness=2)
+BLOCKS.register(LEAF, "LEAF", (0, 255, 0), hardness=1, falloff=2)
+BLOCKS.register(SAND, "SAND", (194, 178, 128), hardness=1, physics=FALLS)
+BLOCKS.register(WATER, "WATER", (30, 80, 200), solid=False, hardness=0, falloff=2, physics=FLOWS)
@@ -0,0 +1,32 @@
+# contains the Camera class, which maps between world and screen coordinates
+
+import pygame
+
+
+class Camera():
+    '''A class to represent the part of the world (in pixels) currently shown on the screen'''
+
+    def __init__(self, screen_size, world_size):
+        self.rect = pygame.Rect((0, 0), screen_size) # the visible region of the world (pixels)
+        self.world_rect = pygame.Rect((0, 0), world_size) # the whole world (pixels)
+
+    def follow(self, target):
+        '''centers the camera on the target rect without showing anything past the edges of the world'''
+        self.rect.center = target.center
+        if self.rect.right > self.world_rect.right: # keep the view inside the world
+            self.rect.right = self.world_rect.right
+        if self.rect.bottom > self.world_rect.bottom:
+            self.rect.bottom = self.world_rect.bottom
+        if self.rect.left < 0: # checked last so small worlds stick to the top left corner of the screen
+            self.rect.left = 0
+        if self.rect.top < 0:
+            self.rect.top = 0
+
+    def apply(self, rect):
+        '''returns a copy of a world rect moved into screen coordinates'''
+        return rect.move(-self.rect.left, -self.rect.top)
+
+    def to_world(self, screen_pos):
+        '''converts an (x, y) screen position (e.g. the mouse) into world coordinates'''
+        return screen_pos[0] + self.rect.left, screen_pos[1] + self.rect.top
+
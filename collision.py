@@ -0,0 +1,87 @@
+# contains the functions for colliding rects (the player, mobs, items...) with the blocks of the environment
+#
+# every column of the world keeps a solidity bitmask, an int whose bit r is set when the block in row r is solid,
+# so checking a whole range of rows in a column is a single bit operation
+
+import numpy as np
+
+
+def build_masks(blocks, solid):
+    '''returns a list with the solidity bitmask of every column of a 2D (rows, columns) array of blocks.
+    solid is the registry's tag-indexed solidity table'''
+    packed = np.packbits(solid[blocks], axis=0, bitorder="little") # (ceil(rows / 8), columns), bit r = row r
+    data = np.ascontiguousarray(packed.T).tobytes() # each column's bytes one after another
+    size = packed.shape[0]
+    return [int.from_bytes(data[column * size:(column + 1) * size], "little") for column in range(packed.shape[1])]
+
+
+def set_mask_bit(mask, row, solid):
+    '''returns the column mask with the bit of row set (solid) or cleared'''
+    if solid:
+        return mask | (1 << row)
+    return mask & ~(1 << row)
+
+
+def any_solid(environment, top_row, bottom_row, column):
+    '''returns True if any block in rows [top_row, bottom_row) of column is solid.
+    Everything left or right of the world and below its bottom is solid, everything above the top is empty'''
+    if column < 0 or column >= environment.columns or bottom_row > environment.rows:
+        return True
+    top_row = max(top_row, 0)
+    if bottom_row <= top_row:
+        return False
+    return bool((environment.get_column_mask(column) >> top_row) & ((1 << (bottom_row - top_row)) - 1))
+
+
+def any_solid_row(environment, row, left_col, right_col):
+    '''returns True if any block in columns [left_col, right_col) of row is solid'''
+    for column in range(left_col, right_col):
+        if any_solid(environment, row, row + 1, column):
+            return True
+    return False
+
+
+def move_x(environment, rect, dx):
+    '''moves rect dx pixels sideways, stopping against the first solid column it would enter.
+    Returns True if it was stopped'''
+    dx = int(dx) # (e.g. a float velocity) the sweep works in whole pixels
+    blck_sz = environment.game_settings.block_size
+    top_row, bottom_row = rect.top // blck_sz, (rect.bottom - 1) // blck_sz + 1 # rows the rect covers
+    if dx > 0:
+        for column in range((rect.right - 1) // blck_sz + 1, (rect.right - 1 + dx) // blck_sz + 1):
+            if any_solid(environment, top_row, bottom_row, column):
+                rect.right = column * blck_sz
+                return True
+    elif dx < 0:
+        for column in range(rect.left // blck_sz - 1, (rect.left + dx) // blck_sz - 1, -1):
+            if any_solid(environment, top_row, bottom_row, column):
+                rect.left = (column + 1) * blck_sz
+                return True
+    rect.x += dx
+    return False
+
+
+def move_y(environment, rect, dy):
+    '''moves rect dy pixels up or down, stopping against the first solid row it would enter.
+    Returns True if it was stopped'''
+    dy = int(dy) # (e.g. a float velocity) the sweep works in whole pixels
+    blck_sz = environment.game_settings.block_size
+    left_col, right_col = rect.left // blck_sz, (rect.right - 1) // blck_sz + 1 # columns the rect covers
+    if dy > 0:
+        for row in range((rect.bottom - 1) // blck_sz + 1, (rect.bottom - 1 + dy) // blck_sz + 1):
+            if any_solid_row(environment, row, left_col, right_col):
+                rect.bottom = row * blck_sz
+                return True
+    elif dy < 0:
+        for row in range(rect.top // blck_sz - 1, (rect.top + dy) // blck_sz - 1, -1):
+            if any_solid_row(environment, row, left_col, right_col):
+                rect.top = (row + 1) * blck_sz
+                return True
+    rect.y += dy
+    return False
+
+
+def move(environment, rect, dx, dy):
+    '''sweeps rect by (dx, dy) against the blocks of the environment, one axis at a time.
+    Returns (hit_x, hit_y), True for each axis the rect was stopped on'''
+    return move_x(environment, rect, dx), move_y(environment, rect, dy)
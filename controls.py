@@ -0,0 +1,123 @@
+# contains the classes and functions that turn input into a stream of timestamped commands
+#
+# an action stream is a list of (tick, command, args) tuples sorted by tick, and can be written to a text file
+# with one "tick command [args...]" line per action. Streams recorded from the keyboard and mouse replay exactly
+# in the game (TERRARIA_REPLAY) or headless through simulation.Simulation
+
+import pygame
+
+
+def start_action(player, flag):
+    setattr(player, flag, True)
+
+
+def stop_action(player, flag):
+    setattr(player, flag, False)
+
+
+def aim(player, x, y):
+    player.aim = (x, y)
+
+
+def jump(player):
+    player.jump()
+
+
+COMMANDS = {"left": (start_action, "left"), "stop_left": (stop_action, "left"),
+            "right": (start_action, "right"), "stop_right": (stop_action, "right"),
+            "break": (start_action, "breaking"), "stop_break": (stop_action, "breaking"),
+            "jump": (jump,), "aim": (aim,)} # command name : (function, fixed arguments...)
+COMMAND_ARGS = {command: 0 for command in COMMANDS} # command name : the number of arguments it takes
+COMMAND_ARGS["aim"] = 2 # (x, y)
+
+
+def apply_action(player, command, args=()):
+    '''applies a single command (e.g. "left", "aim") with its arguments to the player'''
+    function, *fixed = COMMANDS[command]
+    function(player, *fixed, *args)
+
+
+def read_actions(path):
+    '''returns the action stream stored in the text file at path'''
+    actions = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split()
+            if fields and not fields[0].startswith("#"):
+                actions.append((int(fields[0]), fields[1], tuple(int(arg) for arg in fields[2:])))
+    return actions
+
+
+def write_actions(path, actions):
+    '''writes an action stream to a text file at path'''
+    with open(path, "w") as file:
+        for tick, command, args in actions:
+            file.write(" ".join([str(tick), command] + [str(arg) for arg in args]) + "\n")
+
+
+GAME_COMMANDS = ("menu", "quit") # commands handled by the game loop rather than applied to the player
+
+KEY_BINDINGS = {pygame.K_a: "left", pygame.K_d: "right", pygame.K_SPACE: "jump",
+                pygame.K_p: "menu", pygame.K_q: "quit"} # key : command sent when it is pressed
+MOUSE_BINDINGS = {1: "break", 2: "break", 3: "break"} # mouse button : command sent when it is pressed
+
+
+class Action_Stream():
+    '''A class to hand out the actions of a stream tick by tick'''
+
+    def __init__(self, actions):
+        self.actions = sorted(actions, key=lambda action: action[0]) # stable, so same-tick actions keep their order
+        self.next_action = 0 # index of the next action to hand out
+
+    def take(self, tick):
+        '''returns every action due at or before tick that hasn't been handed out yet'''
+        start = self.next_action
+        while self.next_action < len(self.actions) and self.actions[self.next_action][0] <= tick:
+            self.next_action += 1
+        return self.actions[start:self.next_action]
+
+    def is_finished(self):
+        return self.next_action >= len(self.actions)
+
+
+class Input_Handler():
+    '''A class to translate pygame events into commands through configurable key and mouse bindings.
+    Releasing a key or button sends the "stop_" version of its command when there is one'''
+
+    def __init__(self, key_bindings=None, mouse_bindings=None):
+        self.key_bindings = dict(KEY_BINDINGS if key_bindings is None else key_bindings)
+        self.mouse_bindings = dict(MOUSE_BINDINGS if mouse_bindings is None else mouse_bindings)
+        self.last_aim = None # the last world position sent with an "aim" command
+
+    def release(self, command):
+        '''returns the command sent when the input bound to command is released, None if there isn't one'''
+        if "stop_" + command in COMMANDS:
+            return "stop_" + command
+        return None
+
+    def handle_events(self, events, tick):
+        '''returns the (tick, command, args) actions for a frame's events'''
+        actions = []
+        for event in events:
+            command = None
+            if event.type == pygame.QUIT:
+                command = "quit"
+            elif event.type == pygame.KEYDOWN:
+                command = self.key_bindings.get(event.key)
+            elif event.type == pygame.KEYUP and event.key in self.key_bindings:
+                command = self.release(self.key_bindings[event.key])
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                command = self.mouse_bindings.get(event.button)
+            elif event.type == pygame.MOUSEBUTTONUP and event.button in self.mouse_bindings:
+                command = self.release(self.mouse_bindings[event.button])
+            if command is not None:
+                actions.append((tick, command, ()))
+        return actions
+
+    def handle_aim(self, camera, tick):
+        '''returns an "aim" action if the world position under the mouse changed since the last one, else None'''
+        aim = camera.to_world(pygame.mouse.get_pos())
+        if aim == self.last_aim:
+            return None
+        self.last_aim = aim
+        return (tick, "aim", aim)
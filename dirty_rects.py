@@ -0,0 +1,41 @@
+# contains the Dirty_Rects class, which pushes only the changed parts of the screen to the display
+
+import pygame
+
+
+class Dirty_Rects():
+    '''A class to collect the screen rects changed during a frame and update only those parts of the display.
+    Falls back to a full flip when the whole screen changed or the changed area is too large to be worth it'''
+
+    def __init__(self, screen_rect, full_threshold=0.4):
+        self.screen_rect = screen_rect
+        self.full_threshold = full_threshold # the fraction of the screen above which a full flip is used
+        self.rects = [] # the changed screen rects of the current frame
+        self.full = True # True when the whole screen has to be redrawn (always true for the first frame)
+
+    def add(self, rect):
+        '''marks a screen rect as changed'''
+        if rect is not None:
+            rect = rect.clip(self.screen_rect)
+            if rect.width and rect.height:
+                self.rects.append(rect)
+
+    def mark_full(self):
+        '''marks the whole screen as changed (e.g. when the camera moves)'''
+        self.full = True
+
+    def is_full(self):
+        '''returns True if the next frame should redraw and flip the whole screen'''
+        if not self.full:
+            area = sum(rect.width * rect.height for rect in self.rects)
+            self.full = area > self.full_threshold * self.screen_rect.width * self.screen_rect.height
+        return self.full
+
+    def present(self):
+        '''pushes the changed parts of the screen to the display and starts a new frame'''
+        if self.is_full():
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(self.rects)
+        self.rects = []
+        self.full = False
@@ -0,0 +1,102 @@
+# contains the Entity_Store class, which holds and updates every mob and dropped item in the game
+#
+# entities are stored as a structure of arrays: entity i is described by x[i], y[i], yvel[i]... so gravity and
+# velocity clamping are applied to every entity at once with NumPy
+
+import pygame
+import numpy as np
+import collision
+from player import Player
+
+MOB = 1 # kinds of entity
+ITEM = 2
+
+KIND_SIZES = {MOB: (8, 16), ITEM: (6, 6)} # kind : (width, height) in pixels
+KIND_COLORS = {MOB: (200, 60, 60)} # items are drawn in the color of the block they hold
+
+
+class Entity_Store():
+    '''A class to hold every mob and dropped item in contiguous arrays and update them in one batched pass'''
+
+    def __init__(self, capacity=64):
+        self.count = 0 # number of live entities, they always fill the first 'count' slots of every array
+        self.x = np.zeros(capacity, dtype=np.int32) # left of each entity (pixels)
+        self.y = np.zeros(capacity, dtype=np.int32) # top of each entity (pixels)
+        self.width = np.zeros(capacity, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.yvel = np.zeros(capacity, dtype=np.float32)
+        self.direction = np.zeros(capacity, dtype=np.int8) # -1 walking left, 1 walking right, 0 standing still
+        self.kind = np.zeros(capacity, dtype=np.uint8) # MOB or ITEM
+        self.tag = np.zeros(capacity, dtype=np.uint8) # the block an ITEM holds
+        self.grounded = np.zeros(capacity, dtype=bool)
+        self.rect = pygame.Rect(0, 0, 0, 0) # reused for every entity's collision checks
+
+    def grow(self):
+        '''doubles the capacity of every array'''
+        for name in ("x", "y", "width", "height", "yvel", "direction", "kind", "tag", "grounded"):
+            array = getattr(self, name)
+            grown = np.zeros(len(array) * 2, dtype=array.dtype)
+            grown[:self.count] = array[:self.count]
+            setattr(self, name, grown)
+
+    def spawn(self, kind, x, y, direction=0, tag=0):
+        '''adds an entity of the given kind with its top left at (x, y) and returns its index'''
+        if self.count == len(self.x):
+            self.grow()
+        i = self.count
+        self.x[i], self.y[i] = x, y
+        self.width[i], self.height[i] = KIND_SIZES[kind]
+        self.yvel[i] = 0
+        self.direction[i] = direction
+        self.kind[i] = kind
+        self.tag[i] = tag
+        self.grounded[i] = False
+        self.count += 1
+        return i
+
+    def remove(self, i):
+        '''removes entity i by moving the last entity into its slot (so indexes of other entities can change)'''
+        last = self.count - 1
+        for array in (self.x, self.y, self.width, self.height, self.yvel, self.direction, self.kind, self.tag,
+                      self.grounded):
+            array[i] = array[last]
+        self.count = last
+
+    def update(self, environment):
+        '''applies gravity to every entity at once, then moves each one against the blocks of the environment'''
+        n = self.count
+        yvel = self.yvel[:n]
+        yvel -= Player.gravity # the same physics as the player
+        np.minimum(yvel, Player.max_y_vel, out=yvel)
+        dx = (self.direction[:n].astype(np.int32) * Player.xvel).tolist()
+        dy = yvel.astype(np.int32).tolist()
+        xs, ys = self.x[:n].tolist(), self.y[:n].tolist()
+        widths, heights = self.width[:n].tolist(), self.height[:n].tolist()
+        rect = self.rect
+        for i in range(n):
+            rect.update(xs[i], ys[i], widths[i], heights[i])
+            if dx[i] and collision.move_x(environment, rect, dx[i]):
+                self.direction[i] = -self.direction[i] # mobs turn around at walls
+            hit = collision.move_y(environment, rect, dy[i])
+            self.grounded[i] = hit and dy[i] > 0
+            if hit:
+                yvel[i] = 0
+            xs[i], ys[i] = rect.x, rect.y
+        self.x[:n] = xs
+        self.y[:n] = ys
+
+    def draw(self, screen, environment, camera):
+        '''draws every entity the camera can see and returns the list of screen rects they cover'''
+        n = self.count
+        view = camera.rect
+        visible = np.nonzero((self.x[:n] + self.width[:n] > view.left) & (self.x[:n] < view.right) &
+                             (self.y[:n] + self.height[:n] > view.top) & (self.y[:n] < view.bottom))[0]
+        drawn = []
+        for i in visible.tolist():
+            if self.kind[i] == ITEM:
+                color = environment.get_block_color(self.tag[i])
+            else:
+                color = KIND_COLORS[self.kind[i]]
+            drawn.append(pygame.draw.rect(screen, color, (self.x[i] - view.left, self.y[i] - view.top,
+                                                          self.width[i], self.height[i])))
+        return drawn
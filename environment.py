@@ -2,180 +2,143 @@
 
 import pygame
 import random
+import zlib
+import numpy as np
+from collections import OrderedDict
+from renderer import Chunk_Renderer
+from camera import Camera
+from generation import generate_chunk, generate_bands
+from collision import build_masks, set_mask_bit
+from lighting import MAX_LIGHT, compute_light, update_light_region
+from block_updates import Block_Scheduler
 
-pygame.init()
 
+class Environment():
+    '''A class to hold the game environment'''
 
-def check_cols(arr, start, spread, element, two_sided=True):
-    '''checks if an element exists in a 2-D array on the left or right of the column col to a 'spread' of range.
-    returns True if the element is not within the spread, false if it is.
-    Assumes the array is rectangular (width and length are constant)'''
-    length = len(arr)
-    left_bound, right_bound = 0, len(arr[0]) - 1 # assumption of rectangular array
-    if two_sided:
-        for i in range(spread): # for place in spread
-            for row in range(length): # for row in current column
-                if start + i > right_bound: # if we've gone past the right border of the array
-                    break # break this loop
-                else:
-                    if element == arr[row][start + i]: # if the element is equal to
-                        return False
-                if start - i < left_bound:
-                    break
-                else:
-                    if element == arr[row][start - i]:
-                        return False
-    return True
+    def __init__(self, screen, game_settings):
+        self.screen = screen
+        self.game_settings = game_settings
+        self.blocks = game_settings.blocks # the Block_Registry describing every block tag
+        self.rows, self.columns = game_settings.block_dimensions # the size of the world (measured in blocks)
+        self.seed = game_settings.seed # the world seed, every chunk of terrain is generated from it
+        if self.seed is None:
+            self.seed = random.randrange(2 ** 32)
+        self.chunk_width = game_settings.chunk_width # the number of columns generated at a time
+        self.terrain = game_settings.terrain # the Terrain_Settings the world is generated with
+        self.num_env = None # 2D uint8 NumPy array (rows, columns) that stores block values
+        self.surface_values = None # array that will store the y value of the topmost stone block for each column
+        self.masks = None # list of the solidity bitmask of each column (bit r is set if row r is solid)
+        self.light = None # 2D uint8 NumPy array (rows, columns) of how brightly each block is lit (0 to MAX_LIGHT)
+        self.last_light_update = 0 # the number of blocks the last light update visited (useful for profiling)
+        self.change_log = None # when a list, (row, column, tag) of every changed block is added to it (see server.py)
+        self.initialize_env() # fill num_env with a bunch of 0's
+        self.palette = self.create_palette() # (256, 3) array mapping block tags to their RGB colors
+        self.renderer = Chunk_Renderer(self, game_settings.chunk_size) # draws the world from cached chunk surfaces
+        self.block_updates = Block_Scheduler(self) # moves the falling blocks and fluids disturbed by changes
+        self.camera = Camera(screen.get_size(), self.get_world_rect().size) # the part of the world on the screen
 
 
-class Tree:
-    '''A class to represent a tree'''
+    def initialize_env(self):
+        '''Fills num_env with a bunch of 0's'''
+        self.num_env = np.zeros((self.rows, self.columns), dtype=np.uint8)
+        self.surface_values = np.full(self.columns, self.rows, dtype=np.int32)
+        self.masks = [0] * self.columns
+        self.light = np.full((self.rows, self.columns), MAX_LIGHT, dtype=np.uint8)
 
-    def __init__(self):
-        self.wood_height = random.randint(4, 7)
-        self.leaf_spread = self.wood_height - 2
-        self.wood_tag = 6
-        self.leaf_tag = 7
+    def create_palette(self):
+        '''creates an array mapping every possible block tag to its RGB color (the background for empty blocks)'''
+        return self.blocks.get_palette(self.game_settings.colors["BACKGROUND"])
 
+    def get_world_rect(self):
+        '''returns a rect covering the whole world (pixels)'''
+        return pygame.Rect(0, 0, self.columns * self.game_settings.block_size, self.rows * self.game_settings.block_size)
 
-class Ore:
-    '''A class to represent an ore'''
+    def get_block(self, row, column):
+        '''returns the tag of the block at (row, column)'''
+        return self.num_env[row, column]
 
-    def __init__(self, tag, gen_bounds, spawn_prob, min_spawn):
-        self.tag = tag # integer to ID in num_env
-        self.gen_bounds = gen_bounds # the (min, max) number of blocks a cluster of this ore can have
-        self.spawn_prob = spawn_prob # the probability (0, 100) that this ore will be chosen to spawn
-        self.min_spawn = min_spawn # the minimum level (y) this ore can spawn at
+    def get_column_mask(self, column):
+        '''returns the solidity bitmask of column'''
+        return self.masks[column]
 
-    def set_start_spawn(self, game_settings):
-        '''Set the starting spawn level for the ore'''
-        self.start_spawn = random.randint(self.min_spawn, game_settings.block_dimensions[0] - 1)
+    def get_region(self, top_row, left_col, bottom_row, right_col):
+        '''returns the 2D array of blocks in rows [top_row, bottom_row) and columns [left_col, right_col)'''
+        return self.num_env[top_row:bottom_row, left_col:right_col]
 
+    def get_surface(self, column):
+        '''returns the row of the topmost stone block in column'''
+        return self.surface_values[column]
 
-class Environment():
-    '''A class to hold the game environment'''
+    def get_light_region(self, top_row, left_col, bottom_row, right_col):
+        '''returns the 2D array of light levels in rows [top_row, bottom_row) and columns [left_col, right_col)'''
+        return self.light[top_row:bottom_row, left_col:right_col]
 
-    diamond = Ore(5, (3, 9), 5, 60)
-    iron = Ore(4, (2, 6), 25, 40)
-    coal = Ore(3, (4, 12), 75, 0)
-    ores = (diamond, iron, coal)
+    def set_light_region(self, top_row, left_col, light):
+        '''writes a 2D array of light levels into the light map with its top left at (top_row, left_col)'''
+        self.light[top_row:top_row + light.shape[0], left_col:left_col + light.shape[1]] = light
 
-    valid_ores_nums = [2] # add stone's tag to the valid_ores list
-    for ore in ores: # creates a list of block tags that an ore is allowed to replace when spawning (stone / other ores)
-        valid_ores_nums.append(ore.tag)
+    def light_blocks(self, blocks):
+        '''returns the light map of a 2D array of blocks, fully lit if lighting is turned off'''
+        if not self.game_settings.lighting:
+            return np.full(blocks.shape, MAX_LIGHT, dtype=np.uint8)
+        return compute_light(blocks, self.blocks.solid, self.blocks.falloff)
 
-    def __init__(self, screen, game_settings):
-        self.screen = screen
-        self.game_settings = game_settings
-        self.num_env = [] # initialize an empty num_env that will become a 2D array to store block values
-        self.surface_values = [] # list that will store the y value of the topmost stone block for each column
-        self.initialize_env() # fill num_env with a bunch of 0's
+    def set_block(self, row, column, tag, relight=True):
+        '''sets the block at (row, column) to tag and flags its chunk to be re-rendered.
+        relight=False leaves the light to be updated by the caller (e.g. for many blocks at once)'''
+        old = self.num_env[row, column]
+        self.num_env[row, column] = tag
+        self.masks[column] = set_mask_bit(self.masks[column], row, self.blocks.solid[tag])
+        self.block_changed(row, column, old, tag, relight)
 
+    def block_changed(self, row, column, old, tag, relight):
+        '''re-renders, relights and wakes the blocks around (row, column) after it changed from old to tag'''
+        self.renderer.mark_dirty(row, column)
+        if relight and (self.blocks.solid[old] != self.blocks.solid[tag] or
+                        self.blocks.falloff[old] != self.blocks.falloff[tag]): # the only things light depends on
+            self.relight(row, column, row + 1, column + 1)
+        self.block_updates.wake_around(row, column)
+        if self.change_log is not None:
+            self.change_log.append((row, column, int(tag)))
 
-    def initialize_env(self):
-        '''Fills num_env with a bunch of 0's'''
-        for row in range(self.game_settings.block_dimensions[0]):
-            new = []
-            for column in range(self.game_settings.block_dimensions[1]):
-                new.append(0)
-            self.num_env.append(new)
-
-
-    def create_environment(self):
-        '''Creates the environment'''
-        self.create_stone() # creates stone
-        self.create_dirt() # creates dirt layer on top
-        for i in range(50):
-            self.create_ore_cluster() # creates "n" random ore clusters
-        for i in range(3):
-            self.create_tree() # creates "n" trees
-
-    def create_tree(self):
-        '''Creates the trees'''
-        tree = Tree() # instantiates a new tree object with a random tree height
-        column = random.randint(0, self.game_settings.block_dimensions[1] - 1) # selects a random x value for tree
-        can_plant = check_cols(self.num_env, column, 4, tree.wood_tag) # checks that no other tree is within 3 blocks
-        if can_plant: # if no other tree is within 3 blocks
-            row = self.surface_values[column] - 3 # find the starting y value for the trunk to begin
-            for step in range(tree.wood_height): # loop as many times as the height of the tree is
-                self.num_env[row][column] = tree.wood_tag # change the current position to be wood
-                if row <= 0: # if you've hit the top of the screen, don't go further
-                    row = 0
-                else: # otherwise, keep climbing up
-                    row -= 1
-            self.create_leaves(tree, column)
-
-    def create_leaves(self, tree, column):
-        '''Creates the leaves on each tree
-        ONLY TO BE USED IN THE 'create_tree' method'''
-        end_row = self.surface_values[column] - 5 # find the end row
-        start_row = self.surface_values[column] - 5 - tree.leaf_spread # find the start row
-        if start_row > 0:
-            spread = 0
-            while spread < tree.leaf_spread:
-                for row in range(start_row, end_row):
-                    if row >= 0:
-                        for col in range(column - spread, column + spread + 1):
-                            if 0 <= col < self.game_settings.block_dimensions[1]:
-                                if self.num_env[row][col] == 0:
-                                    self.num_env[row][col] = tree.leaf_tag
-                    spread += 1
-
-    def create_stone(self):
-        '''create the stone of the world'''
-        highest_bound = self.game_settings.block_dimensions[0] // 5 # highest possible starting surface value
-        lowest_bound = self.game_settings.block_dimensions[0] // 4 # lowest possible starting surface value
-        surface_val = random.randint(highest_bound, lowest_bound) # pick a random spot between (inclusive) for surf_val
-        for column in range(self.game_settings.block_dimensions[1]): # iterating through column by column
-            for row in range(surface_val, self.game_settings.block_dimensions[0]):
-                self.num_env[row][column] = 2
-                if len(self.surface_values) <= column:
-                    self.surface_values.append(row) # appends this row's top stone block to surface values
-            surface_val += random.randint(0, self.game_settings.block_dimensions[0] // 40) * random.randint(-1, 1)
-            # move the new surface value up or down a certain amount
-            if surface_val < 4: # if new surface value is less than 4
-                surface_val = 4 # set it to 4
-            elif surface_val > self.game_settings.block_dimensions[0]: # if it's gone beyond bottom of the screen
-                surface_val = self.game_settings.block_dimensions[0] # set it equal to the bottom of the screen
-
-    def create_ore_cluster(self):
-        '''creates a cluster of coal'''
-        ore = self.pick_ore() # pick an ore to spawn
-        ore.set_start_spawn(self.game_settings) # pick a random starting row (y)
-        column = random.randint(0, self.game_settings.block_dimensions[1] - 1) # pick a random starting column (x)
-        row = ore.start_spawn
-        num_blocks = random.randint(ore.gen_bounds[0], ore.gen_bounds[1]) # initialize the # of blocks in this cluster
-        for i in range(num_blocks): # loop as many times as there are blocks in this cluster
-            if column < 0: # if too far left
-                column = 0
-            elif column >= self.game_settings.block_dimensions[1]: # if too far right
-                column = self.game_settings.block_dimensions[1] - 1
-            if row >= self.game_settings.block_dimensions[0]: # if too far down
-                row = self.game_settings.block_dimensions[0] - 1
-            elif row < self.surface_values[column]: # if too far up
-                row = self.surface_values[column]
-            self.num_env[row][column] = ore.tag # set the position as ore
-            column += 1 * random.randint(-1, 1) # find new column (x)
-            row += 1 * random.randint(-1, 1) # find new row (y)
-
-    def pick_ore(self):
-        '''selects an ore to generate'''
-        num = random.randint(0, 100) # pick a random number 1 - 100
-        for ore in Environment.ores: # for possible Ores
-            if num < ore.spawn_prob: # if number chosen is less than that ore's spawn probability
-                return ore # return it
-        return Environment.ores[len(Environment.ores) - 1] # otherwise return the last Ore in the list (the most common)
-
-    def create_dirt(self):
-        '''creates a layer of 3 dirt on top of the stone'''
-        for column in range(self.game_settings.block_dimensions[1]): # iterate through by column
-            top_stone = self.surface_values[column] # locate the value of the top stone
-            dirt_surface = self.surface_values[column] - 3 # create new surface value
-            for row in range(dirt_surface, top_stone): # for values in between
-                self.num_env[row][column] = 1 # turn those rows into dirt
-
-    def draw_environment(self):
-        '''draws the environment to the screen'''
+    def relight(self, top_row, left_col, bottom_row, right_col):
+        '''updates the light around the blocks in rows [top_row, bottom_row) and columns [left_col, right_col)'''
+        if self.game_settings.lighting:
+            self.last_light_update = update_light_region(self, top_row, left_col, bottom_row, right_col)
+
+
+    def create_environment(self, progress=None):
+        '''Creates the environment in bands of chunks, in parallel if the settings ask for more than one worker.
+        progress, if given, is called with (chunks created, chunk count) after each band'''
+        chunk_count = -(-self.columns // self.chunk_width) # ceiling division
+        for first_chunk, blocks, surface_values in generate_bands(self.seed, chunk_count, self.chunk_width, self.rows,
+                                                                  self.game_settings.generation_workers, self.terrain):
+            left = first_chunk * self.chunk_width
+            right = min(left + blocks.shape[1], self.columns) # the last chunk may hang off the edge of the world
+            self.num_env[:, left:right] = blocks[:, :right - left] # one block copy per band
+            self.surface_values[left:right] = surface_values[:right - left]
+            if progress is not None:
+                progress(min(first_chunk + blocks.shape[1] // self.chunk_width, chunk_count), chunk_count)
+        self.refresh()
+
+    def refresh(self):
+        '''rebuilds everything derived from num_env, must be called after writing to num_env directly'''
+        self.masks = build_masks(self.num_env, self.blocks.solid)
+        self.light = self.light_blocks(self.num_env)
+        self.renderer.invalidate() # the whole world has changed, so every cached chunk is stale
+
+    def load_around(self, x):
+        '''makes sure the world near the x coordinate (pixels) is generated.
+        The whole of a finite world is created up front, so there is nothing to do'''
+        pass
+
+    def draw_environment(self, area=None):
+        '''draws the environment to the screen, or only the part inside area (a screen rect) if it's given'''
+        self.renderer.draw(self.screen, self.camera, area)
+
+    def draw_environment_blocks(self):
+        '''draws the environment to the screen one block at a time (uncached, kept for benchmarking)'''
         row_num = 0
         for row in self.num_env:
             block_num = 0
@@ -189,39 +152,146 @@ class Environment():
             row_num += 1
 
     def get_block_color(self, block_id):
-        '''draws given block to the screen'''
-        if block_id:
-            if block_id == 1:
-                return self.game_settings.colors["DIRT"]
-            elif block_id == 2:
-                return self.game_settings.colors["STONE"]
-            elif block_id == 3:
-                return self.game_settings.colors["COAL"]
-            elif block_id == 4:
-                return self.game_settings.colors["IRON"]
-            elif block_id == 5:
-                return self.game_settings.colors["DIAMOND"]
-            elif block_id == 6:
-                return self.game_settings.colors["WOOD"]
-            elif block_id == 7:
-                return self.game_settings.colors["LEAF"]
-        return None
+        '''returns the RGB color of the given block, None for air'''
+        return self.blocks.color_list[block_id]
 
     def get_block_name(self, block_id):
-        if block_id:
-            if block_id == 1:
-                return "DIRT"
-            elif block_id == 2:
-                return "STONE"
-            elif block_id == 3:
-                return "COAL"
-            elif block_id == 4:
-                return "IRON"
-            elif block_id == 5:
-                return "DIAMOND"
-            elif block_id == 6:
-                return "WOOD"
-            elif block_id == 7:
-                return "LEAF"
-        return None
+        '''returns the name of the given block'''
+        return self.blocks.names[block_id]
+
+
+class World_Chunk():
+    '''A class to hold the blocks of one generated chunk of a Chunked_Environment'''
+
+    def __init__(self, blocks, surface_values, solid, light):
+        self.blocks = blocks # 2D uint8 array (rows, chunk_width) of block values
+        self.light = light # 2D uint8 array (rows, chunk_width) of light levels, lit as if the chunk stood alone
+        self.surface_values = surface_values # the topmost stone row of each column in the chunk
+        self.modified = False # True once a block has been changed since the chunk was generated
+        self.masks = build_masks(blocks, solid) # the solidity bitmask of each column in the chunk
+
+
+class Chunked_Environment(Environment):
+    '''A class to hold an endless game environment that is generated a chunk at a time as the player approaches.
+    Only the most recently used chunks are kept; unmodified chunks are regenerated from the seed when they are
+    needed again and modified ones are kept compressed'''
+
+    max_columns = 2 ** 24 # far enough to never be reached, while keeping pixel coordinates inside a Rect
+
+    def initialize_env(self):
+        '''Starts the world with no chunks loaded'''
+        self.columns = Chunked_Environment.max_columns
+        self.chunks = OrderedDict() # {chunk_x : World_Chunk} of loaded chunks, least recently used first
+        self.stored = {} # {chunk_x : (compressed blocks, surface_values)} of modified chunks that were evicted
+        self.world_file = None # the World_File this world was loaded from, if any
+
+    def get_chunk(self, chunk_x):
+        '''returns the chunk chunk_x, generating or reloading it if needed'''
+        chunk = self.chunks.get(chunk_x)
+        if chunk is None:
+            chunk = self.load_chunk(chunk_x)
+            self.chunks[chunk_x] = chunk
+            self.evict_chunks()
+        else:
+            self.chunks.move_to_end(chunk_x) # mark as most recently used
+        return chunk
+
+    def load_chunk(self, chunk_x):
+        '''reloads chunk chunk_x if it was modified and evicted or saved, otherwise generates it from the seed'''
+        if chunk_x in self.stored:
+            data, surface_values = self.stored.pop(chunk_x)
+            blocks = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(self.rows, self.chunk_width).copy()
+            chunk = World_Chunk(blocks, surface_values, self.blocks.solid, self.light_blocks(blocks))
+            chunk.modified = True
+            return chunk
+        if self.world_file is not None:
+            saved = self.world_file.read_chunk(chunk_x)
+            if saved is not None:
+                chunk = World_Chunk(*saved, self.blocks.solid, self.light_blocks(saved[0]))
+                chunk.modified = True # it differs from the generated terrain, or it wouldn't have been saved
+                return chunk
+        blocks, surface_values = generate_chunk(self.seed, chunk_x, self.chunk_width, self.rows, self.terrain)
+        return World_Chunk(blocks, surface_values, self.blocks.solid, self.light_blocks(blocks))
+
+    def evict_chunks(self):
+        '''drops the least recently used chunks until the loaded chunks fit in the memory budget'''
+        while len(self.chunks) > self.game_settings.max_loaded_chunks:
+            chunk_x, chunk = self.chunks.popitem(last=False)
+            if chunk.modified: # can't be regenerated, so keep a compressed copy
+                self.stored[chunk_x] = (zlib.compress(chunk.blocks.tobytes()), chunk.surface_values)
+
+    def get_block(self, row, column):
+        '''returns the tag of the block at (row, column)'''
+        return self.get_chunk(column // self.chunk_width).blocks[row, column % self.chunk_width]
+
+    def get_column_mask(self, column):
+        '''returns the solidity bitmask of column'''
+        return self.get_chunk(column // self.chunk_width).masks[column % self.chunk_width]
+
+    def chunk_spans(self, left_col, right_col):
+        '''yields (chunk, offset, width, column) for every chunk overlapping columns [left_col, right_col), where
+        the chunk's columns [offset, offset + width) are the world's columns [column, column + width)'''
+        left_col, right_col = max(left_col, 0), min(right_col, self.columns)
+        column = left_col
+        while column < right_col:
+            chunk_x, offset = divmod(column, self.chunk_width)
+            width = min(self.chunk_width - offset, right_col - column)
+            yield self.get_chunk(chunk_x), offset, width, column
+            column += width
+
+    def get_region(self, top_row, left_col, bottom_row, right_col):
+        '''returns the 2D array of blocks in rows [top_row, bottom_row) and columns [left_col, right_col)'''
+        parts = [chunk.blocks[top_row:bottom_row, offset:offset + width]
+                 for chunk, offset, width, column in self.chunk_spans(left_col, right_col)]
+        if len(parts) == 1:
+            return parts[0]
+        return np.hstack(parts)
+
+    def get_light_region(self, top_row, left_col, bottom_row, right_col):
+        '''returns the 2D array of light levels in rows [top_row, bottom_row) and columns [left_col, right_col)'''
+        parts = [chunk.light[top_row:bottom_row, offset:offset + width]
+                 for chunk, offset, width, column in self.chunk_spans(left_col, right_col)]
+        if len(parts) == 1:
+            return parts[0]
+        return np.hstack(parts)
+
+    def set_light_region(self, top_row, left_col, light):
+        '''writes a 2D array of light levels into the light map with its top left at (top_row, left_col)'''
+        for chunk, offset, width, column in self.chunk_spans(left_col, left_col + light.shape[1]):
+            chunk.light[top_row:top_row + light.shape[0], offset:offset + width] = \
+                light[:, column - left_col:column - left_col + width]
+
+    def get_surface(self, column):
+        '''returns the row of the topmost stone block in column'''
+        return self.get_chunk(column // self.chunk_width).surface_values[column % self.chunk_width]
+
+    def set_block(self, row, column, tag, relight=True):
+        '''sets the block at (row, column) to tag and flags its chunk to be re-rendered.
+        relight=False leaves the light to be updated by the caller (e.g. for many blocks at once)'''
+        chunk = self.get_chunk(column // self.chunk_width)
+        offset = column % self.chunk_width
+        old = chunk.blocks[row, offset]
+        chunk.blocks[row, offset] = tag
+        chunk.masks[offset] = set_mask_bit(chunk.masks[offset], row, self.blocks.solid[tag])
+        chunk.modified = True
+        self.block_changed(row, column, old, tag, relight)
+
+    def create_environment(self, progress=None):
+        '''Creates the chunks around the spawn point, the rest of the world is created as it is approached.
+        progress, if given, is called with (chunks created, chunk count) after each chunk'''
+        chunks = self.chunks_around(0)
+        for done, chunk_x in enumerate(chunks, 1):
+            self.get_chunk(chunk_x)
+            if progress is not None:
+                progress(done, len(chunks))
+
+    def chunks_around(self, x):
+        '''returns the range of chunk_x within load_radius of the x coordinate (pixels)'''
+        center = x // (self.chunk_width * self.game_settings.block_size)
+        radius = self.game_settings.load_radius
+        return range(max(center - radius, 0), center + radius + 1)
 
+    def load_around(self, x):
+        '''makes sure the chunks within load_radius of the x coordinate (pixels) are generated'''
+        for chunk_x in self.chunks_around(x):
+            self.get_chunk(chunk_x)
@@ -0,0 +1,30 @@
+# contains the functions for loading fonts and rendering text once and reusing the result
+
+import pygame
+
+fonts = {} # {(name, size) : Font} of every font loaded so far
+texts = {} # {(name, size, text, color) : Surface} of every string rendered so far
+MAX_TEXTS = 1024 # the most rendered strings kept before the text cache is emptied
+
+
+def get_font(name, size):
+    '''returns the system font 'name' at size, only looking it up the first time it is asked for'''
+    font = fonts.get((name, size))
+    if font is None:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        font = pygame.font.SysFont(name, size)
+        fonts[(name, size)] = font
+    return font
+
+
+def render_text(name, size, text, color):
+    '''returns a surface with text rendered in the given font and color, reusing earlier renders of the same text'''
+    key = (name, size, text, color)
+    surface = texts.get(key)
+    if surface is None:
+        if len(texts) >= MAX_TEXTS: # changing text (e.g. counters) would otherwise grow the cache forever
+            texts.clear()
+        surface = get_font(name, size).render(text, False, color)
+        texts[key] = surface
+    return surface
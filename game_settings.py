@@ -1,9 +1,50 @@
 # contains the class and functions for the game's settings
 
+from blocks import BLOCKS, COAL, IRON, DIAMOND
+
+BLOCK_COLORS = BLOCKS.get_color_dict() # {"BLOCK_NAME" : (R, G, B)}, the colors themselves live in the block registry
+
+
+class Terrain_Settings():
+    '''A class to hold the parameters of the terrain generator.
+    Scales are the distance (blocks) between the corners of the noise lattice, bigger scales give smoother shapes'''
+
+    def __init__(self, generator="noise", surface_level=0.22, surface_amplitude=12, surface_scale=64,
+                 surface_octaves=4, cave_scale=24, cave_octaves=3, cave_threshold=0.66, cave_depth=6, ore_scale=3,
+                 ore_thresholds=None, persistence=0.5, water_level=1, beach_height=1):
+        self.generator = generator # "noise", or "walk" for the original random walk generator
+        self.surface_level = surface_level # the average height of the surface, as a fraction of the world's rows
+        self.surface_amplitude = surface_amplitude # the most the surface rises or falls from its average (blocks)
+        self.surface_scale = surface_scale
+        self.surface_octaves = surface_octaves # the number of layers of ever finer noise added to the surface
+        self.cave_scale = cave_scale
+        self.cave_octaves = cave_octaves
+        self.cave_threshold = cave_threshold # stone becomes cave where the cave noise is above this (0, 1)
+        self.cave_depth = cave_depth # the number of rows of stone below the surface that caves can't break through
+        self.ore_scale = ore_scale
+        if ore_thresholds is None: # stone becomes ore where that ore's noise is above its threshold
+            ore_thresholds = {COAL: 0.94, IRON: 0.965, DIAMOND: 0.985}
+        self.ore_thresholds = ore_thresholds # {ore tag : threshold}
+        self.persistence = persistence # how much each octave of noise is weighted relative to the one before
+        self.water_level = water_level # lakes fill the ground below this many rows under the average surface
+        self.beach_height = beach_height # ground up to this many rows above the lakes is sand rather than dirt
+
+
 class Game_Settings():
     '''A class to hold the game's settings'''
 
-    def __init__(self, block_size, block_dimensions, colors):
+    def __init__(self, block_size, block_dimensions, colors, chunk_size=16, seed=None, chunk_width=32,
+                 max_loaded_chunks=64, load_radius=3, generation_workers=1, blocks=BLOCKS,
+                 terrain=None, lighting=True):
         self.block_size = block_size # the side length (pixels) of blocks in this world
         self.block_dimensions = block_dimensions # the (height, width) of the world (measured in blocks)
         self.colors = colors # dictionary {"BLOCK_NAME" : (R, G, B)} contains the RGB values of each block
+        self.chunk_size = chunk_size # the side length (blocks) of the cached chunks the world is drawn from
+        self.seed = seed # the world seed, the same seed always creates the same world (None picks one at random)
+        self.chunk_width = chunk_width # the number of columns in each generated chunk of the world
+        self.max_loaded_chunks = max_loaded_chunks # the most generated chunks kept in memory by an endless world
+        self.load_radius = load_radius # how many chunks either side of the player are generated ahead of time
+        self.generation_workers = generation_workers # the number of processes used to generate a finite world
+        self.blocks = blocks # the Block_Registry holding the properties of every block tag
+        self.terrain = Terrain_Settings() if terrain is None else terrain # the parameters of the terrain generator
+        self.lighting = lighting # False draws every block fully lit
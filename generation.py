@@ -0,0 +1,343 @@
+# contains the classes and functions that generate the world one chunk (a fixed-width band of columns) at a time
+
+import random
+import numpy as np
+from blocks import AIR, DIRT, STONE, COAL, IRON, DIAMOND, WOOD, LEAF, SAND, WATER
+from game_settings import Terrain_Settings
+from terrain_noise import lattice_values, value_noise_2d, fractal_noise_1d, fractal_noise_2d
+from concurrent.futures import ProcessPoolExecutor
+
+ORE_CLUSTERS_PER_COLUMN = 50 / 140 # how many ore clusters are spawned per column of the world
+TREES_PER_COLUMN = 3 / 140 # how many trees are attempted per column of the world
+EDGE_SALT = 1 # mixed into the seed of the surface height shared by two neighbouring chunks
+SURFACE_SALT = 2 # mixed into the seeds of the noise fields of the noise generator
+CAVE_SALT = 3
+TREE_SALT = 4 # (and the next two)
+ORE_SALT = 16 # plus the ore's tag
+TREE_SPACING = 10 # the noise generator plants at most one tree in each run of this many columns
+SERIAL_BANDS = 8 # bands a world is generated in without workers, so progress can be reported between them
+
+
+def check_cols(arr, start, spread, element, two_sided=True):
+    '''checks if an element exists in a 2-D array on the left or right of the column col to a 'spread' of range.
+    returns True if the element is not within the spread, false if it is.
+    Assumes the array is a 2-D NumPy array'''
+    left = max(start - spread + 1, 0) if two_sided else start # leftmost column within the spread
+    right = min(start + spread, arr.shape[1]) # one past the rightmost column within the spread
+    return not (arr[:, left:right] == element).any()
+
+
+def chunk_seed(seed, chunk_x, salt=0):
+    '''returns the seed of the chunk chunk_x in a world created from seed.
+    The same (seed, chunk_x, salt) always gives the same value, in every process'''
+    return (seed * 0x9E3779B1 + chunk_x * 0x85EBCA77 + salt * 0xC2B2AE3D) & 0xFFFFFFFFFFFFFFFF
+
+
+def edge_height(seed, edge, rows):
+    '''returns the surface (top stone) row at the left edge of chunk 'edge', shared with the chunk to its left'''
+    rng = random.Random(chunk_seed(seed, edge, EDGE_SALT))
+    return rng.randint(rows // 5, rows // 4)
+
+
+def scaled_count(rng, per_column, width):
+    '''returns how many features to spawn in a chunk of width columns, rounding the fraction at random'''
+    expected = per_column * width
+    return int(expected) + (rng.random() < expected - int(expected))
+
+
+class Tree:
+    '''A class to represent a tree'''
+
+    def __init__(self, rng):
+        self.wood_height = rng.randint(4, 7)
+        self.leaf_spread = self.wood_height - 2
+        self.wood_tag = WOOD
+        self.leaf_tag = LEAF
+
+
+class Ore:
+    '''A class to represent an ore'''
+
+    def __init__(self, tag, gen_bounds, spawn_prob, min_spawn):
+        self.tag = tag # integer to ID in num_env
+        self.gen_bounds = gen_bounds # the (min, max) number of blocks a cluster of this ore can have
+        self.spawn_prob = spawn_prob # the probability (0, 100) that this ore will be chosen to spawn
+        self.min_spawn = min_spawn # the minimum level (y) this ore can spawn at
+
+    def pick_start_spawn(self, rng, rows):
+        '''Returns a random starting spawn level for the ore'''
+        return rng.randint(self.min_spawn, rows - 1)
+
+
+class Chunk_Generator():
+    '''A class to generate the blocks of one chunk from the world seed and the chunk's coordinate'''
+
+    diamond = Ore(DIAMOND, (3, 9), 5, 60)
+    iron = Ore(IRON, (2, 6), 25, 40)
+    coal = Ore(COAL, (4, 12), 75, 0)
+    ores = (diamond, iron, coal)
+
+    valid_ores_nums = [STONE] # add stone's tag to the valid_ores list
+    for ore in ores: # creates a list of block tags that an ore is allowed to replace when spawning (stone / other ores)
+        valid_ores_nums.append(ore.tag)
+
+    def __init__(self, seed, chunk_x, width, rows):
+        self.seed = seed
+        self.chunk_x = chunk_x # the chunk's coordinate, its first column is chunk_x * width
+        self.width = width # the number of columns in the chunk
+        self.rows = rows # the number of rows in the chunk (the height of the world)
+        self.rng = random.Random(chunk_seed(seed, chunk_x)) # every random choice in this chunk comes from here
+        self.num_env = np.zeros((rows, width), dtype=np.uint8)
+        self.surface_values = np.zeros(width, dtype=np.int32)
+
+    def generate(self):
+        '''Creates the chunk and returns its (blocks, surface_values) arrays'''
+        self.create_stone() # creates stone
+        self.create_dirt() # creates dirt layer on top
+        for i in range(scaled_count(self.rng, ORE_CLUSTERS_PER_COLUMN, self.width)):
+            self.create_ore_cluster() # creates "n" random ore clusters
+        for i in range(scaled_count(self.rng, TREES_PER_COLUMN, self.width)):
+            self.create_tree() # creates "n" trees
+        return self.num_env, self.surface_values
+
+    def create_tree(self):
+        '''Creates the trees'''
+        tree = Tree(self.rng) # instantiates a new tree object with a random tree height
+        margin = tree.leaf_spread # keep the leaves inside this chunk
+        if self.width <= 2 * margin:
+            return
+        column = self.rng.randint(margin, self.width - 1 - margin) # selects a random x value for tree
+        can_plant = check_cols(self.num_env, column, 4, tree.wood_tag) # checks that no other tree is within 3 blocks
+        if can_plant: # if no other tree is within 3 blocks
+            row = self.surface_values[column] - 3 # find the starting y value for the trunk to begin
+            for step in range(tree.wood_height): # loop as many times as the height of the tree is
+                self.num_env[row, column] = tree.wood_tag # change the current position to be wood
+                if row <= 0: # if you've hit the top of the screen, don't go further
+                    row = 0
+                else: # otherwise, keep climbing up
+                    row -= 1
+            self.create_leaves(tree, column)
+
+    def create_leaves(self, tree, column):
+        '''Creates the leaves on each tree
+        ONLY TO BE USED IN THE 'create_tree' method'''
+        end_row = self.surface_values[column] - 5 # find the end row
+        start_row = self.surface_values[column] - 5 - tree.leaf_spread # find the start row
+        if start_row > 0:
+            spread = 0
+            while spread < tree.leaf_spread:
+                for row in range(start_row, end_row):
+                    if row >= 0:
+                        for col in range(column - spread, column + spread + 1):
+                            if 0 <= col < self.width:
+                                if self.num_env[row, col] == AIR:
+                                    self.num_env[row, col] = tree.leaf_tag
+                    spread += 1
+
+    def create_stone(self):
+        '''create the stone of the chunk.
+        The surface is a random walk that is bent to meet the seeded heights at both edges of the chunk,
+        so neighbouring chunks line up no matter which one is generated first'''
+        surface_val = edge_height(self.seed, self.chunk_x, self.rows) # shared with the chunk on the left
+        end_val = edge_height(self.seed, self.chunk_x + 1, self.rows) # shared with the chunk on the right
+        for column in range(self.width): # iterating through column by column
+            self.surface_values[column] = surface_val
+            surface_val += self.rng.randint(0, self.rows // 40) * self.rng.randint(-1, 1)
+            # move the new surface value up or down a certain amount
+        drift = end_val - surface_val # how far the walk would miss the right edge by
+        self.surface_values += np.round(drift * np.arange(self.width) / self.width).astype(np.int32)
+        np.clip(self.surface_values, 4, self.rows - 1, out=self.surface_values) # keep a stone block in each column
+        rows = np.arange(self.rows)[:, None] # column vector of row numbers
+        self.num_env[rows >= self.surface_values] = STONE # fill every column with stone from its surface down
+
+    def create_ore_cluster(self):
+        '''creates a cluster of coal'''
+        ore = self.pick_ore() # pick an ore to spawn
+        row = ore.pick_start_spawn(self.rng, self.rows) # pick a random starting row (y)
+        column = self.rng.randint(0, self.width - 1) # pick a random starting column (x)
+        num_blocks = self.rng.randint(ore.gen_bounds[0], ore.gen_bounds[1]) # initialize the # of blocks in this cluster
+        for i in range(num_blocks): # loop as many times as there are blocks in this cluster
+            if column < 0: # if too far left
+                column = 0
+            elif column >= self.width: # if too far right
+                column = self.width - 1
+            if row >= self.rows: # if too far down
+                row = self.rows - 1
+            elif row < self.surface_values[column]: # if too far up
+                row = self.surface_values[column]
+            self.num_env[row, column] = ore.tag # set the position as ore
+            column += 1 * self.rng.randint(-1, 1) # find new column (x)
+            row += 1 * self.rng.randint(-1, 1) # find new row (y)
+
+    def pick_ore(self):
+        '''selects an ore to generate'''
+        num = self.rng.randint(0, 100) # pick a random number 1 - 100
+        for ore in Chunk_Generator.ores: # for possible Ores
+            if num < ore.spawn_prob: # if number chosen is less than that ore's spawn probability
+                return ore # return it
+        return Chunk_Generator.ores[len(Chunk_Generator.ores) - 1] # otherwise return the last Ore in the list
+
+    def create_dirt(self):
+        '''creates a layer of 3 dirt on top of the stone'''
+        rows = np.arange(self.rows)[:, None] # column vector of row numbers
+        dirt = (rows >= self.surface_values - 3) & (rows < self.surface_values) # the 3 rows above each top stone
+        self.num_env[dirt] = DIRT # turn those rows into dirt
+
+
+class Noise_Generator(Chunk_Generator):
+    '''A class to generate any range of columns of the world at once from seeded noise fields.
+    The surface is a 1D noise heightmap with lakes filling its lowest dips, and the caves and ores are 2D noise
+    fields thresholded as whole arrays.
+    Everything (trees included) only depends on the seed and world coordinates, so a band of chunks generated in
+    one pass is identical to the same chunks generated one at a time'''
+
+    def __init__(self, seed, left, width, rows, terrain):
+        self.seed = seed
+        self.left = left # the world column of the first generated column
+        self.width = width
+        self.rows = rows
+        self.terrain = terrain # the Terrain_Settings of the world
+        self.num_env = np.zeros((rows, width), dtype=np.uint8)
+        self.surface_values = np.zeros(width, dtype=np.int32)
+
+    def key(self, salt):
+        '''returns the 64 bit key of one of the world's noise fields'''
+        return chunk_seed(self.seed, 0, salt)
+
+    def generate(self):
+        '''Creates the columns and returns their (blocks, surface_values) arrays'''
+        self.create_stone()
+        self.create_dirt()
+        self.create_lakes()
+        self.create_ores()
+        self.create_caves()
+        self.create_trees()
+        return self.num_env, self.surface_values
+
+    def surface_heights(self, left, width):
+        '''returns the surface (top stone) row of the width columns from world column left'''
+        terrain = self.terrain
+        noise = fractal_noise_1d(self.key(SURFACE_SALT), left, width, terrain.surface_scale, terrain.surface_octaves,
+                                 terrain.persistence)
+        heights = np.round(self.rows * terrain.surface_level + (noise * 2 - 1) * terrain.surface_amplitude)
+        return np.clip(heights, 4, self.rows - 1).astype(np.int32) # keep a stone block in each column
+
+    def create_stone(self):
+        '''fills every column with stone from its surface down'''
+        self.surface_values[:] = self.surface_heights(self.left, self.width)
+        rows = np.arange(self.rows)[:, None] # column vector of row numbers
+        self.num_env[rows >= self.surface_values] = STONE
+
+    def lake_level(self):
+        '''returns the row of the top of every lake'''
+        return int(round(self.rows * self.terrain.surface_level)) + self.terrain.water_level
+
+    def create_lakes(self):
+        '''fills the air from the lake level down to the ground with water, and turns the dirt of the lake beds
+        and the ground just above them into sand'''
+        rows = np.arange(self.rows)[:, None]
+        ground = self.surface_values - 3 # the top dirt block of each column
+        level = self.lake_level()
+        self.num_env[(rows >= level) & (rows < ground)] = WATER
+        beach = ground >= level - self.terrain.beach_height # the columns of the lake beds and their shores
+        self.num_env[(self.num_env == DIRT) & beach] = SAND
+
+    def create_ores(self):
+        '''turns the stone where each ore's noise field is above its threshold into that ore, rarest ore last'''
+        terrain = self.terrain
+        rows = np.arange(self.rows)[:, None]
+        stone = self.num_env == STONE
+        for ore in reversed(Chunk_Generator.ores):
+            field = value_noise_2d(self.key(ORE_SALT + ore.tag), self.left, self.width, self.rows, terrain.ore_scale)
+            self.num_env[stone & (field > terrain.ore_thresholds[ore.tag]) & (rows >= ore.min_spawn)] = ore.tag
+
+    def create_caves(self):
+        '''carves air where the cave noise field is above its threshold, below the top cave_depth rows of stone'''
+        terrain = self.terrain
+        field = fractal_noise_2d(self.key(CAVE_SALT), self.left, self.width, self.rows, terrain.cave_scale,
+                                 terrain.cave_octaves, terrain.persistence)
+        rows = np.arange(self.rows)[:, None]
+        self.num_env[(field > terrain.cave_threshold) & (rows >= self.surface_values + terrain.cave_depth)] = AIR
+
+    def create_trees(self):
+        '''plants the trees of every run of TREE_SPACING columns whose leaves reach the generated columns.
+        All the trunks are placed before any leaves, and leaves only replace air, so the order trees are planted
+        in (and so which chunk plants them) doesn't matter'''
+        margin = 5 # the widest leaf spread, from the tallest tree
+        first_cell = (self.left - margin) // TREE_SPACING
+        cells = np.arange(first_cell, (self.left + self.width + margin - 1) // TREE_SPACING + 1)
+        zero = np.zeros(1, dtype=np.int64)
+        planted = lattice_values(self.key(TREE_SALT), cells, zero) < TREES_PER_COLUMN * TREE_SPACING
+        offsets = (lattice_values(self.key(TREE_SALT + 1), cells, zero) * (TREE_SPACING - 4)).astype(np.int64) + 2
+        heights = (lattice_values(self.key(TREE_SALT + 2), cells, zero) * 4).astype(np.int64) + 4 # 4 to 7 blocks
+        columns = cells * TREE_SPACING + offsets # the world column of each cell's tree
+        surfaces = self.surface_heights(first_cell * TREE_SPACING, len(cells) * TREE_SPACING)
+        surfaces = surfaces[columns - first_cell * TREE_SPACING]
+        planted &= surfaces - 3 < self.lake_level() - self.terrain.beach_height # no trees on beaches or in lakes
+        trees = [(column - self.left, int(surface), int(height)) for column, surface, height, plant
+                 in zip(columns.tolist(), surfaces, heights.tolist(), planted.tolist()) if plant]
+        for column, surface, height in trees:
+            if 0 <= column < self.width:
+                self.num_env[max(surface - 2 - height, 0):surface - 2, column] = WOOD
+        for column, surface, height in trees:
+            spread = height - 2
+            start_row = surface - 5 - spread
+            if start_row > 0:
+                for step in range(spread): # each row of leaves is one block wider on both sides than the last
+                    left, right = max(column - step, 0), min(column + step + 1, self.width)
+                    if left < right:
+                        leaves = self.num_env[start_row + step, left:right]
+                        leaves[leaves == AIR] = LEAF
+
+
+def generate_chunk(seed, chunk_x, width, rows, terrain=None):
+    '''returns the (blocks, surface_values) arrays of chunk chunk_x of the world created from seed'''
+    return generate_band(seed, chunk_x, 1, width, rows, terrain)
+
+
+def generate_band(seed, first_chunk, chunk_count, width, rows, terrain=None):
+    '''returns the (blocks, surface_values) arrays of chunk_count neighbouring chunks starting at first_chunk.
+    Runs in a worker process when generating in parallel, so it only takes and returns plain values'''
+    if terrain is None:
+        terrain = Terrain_Settings()
+    if terrain.generator == "noise":
+        return Noise_Generator(seed, first_chunk * width, chunk_count * width, rows, terrain).generate()
+    if terrain.generator != "walk":
+        raise ValueError("unknown terrain generator %r" % terrain.generator)
+    blocks = np.empty((rows, chunk_count * width), dtype=np.uint8)
+    surface_values = np.empty(chunk_count * width, dtype=np.int32)
+    for i in range(chunk_count):
+        chunk_blocks, chunk_surface = Chunk_Generator(seed, first_chunk + i, width, rows).generate()
+        blocks[:, i * width:(i + 1) * width] = chunk_blocks
+        surface_values[i * width:(i + 1) * width] = chunk_surface
+    return blocks, surface_values
+
+
+def split_bands(chunk_count, band_count):
+    '''returns a list of (first_chunk, chunk_count) bands covering chunk_count chunks as evenly as possible'''
+    band_count = max(min(band_count, chunk_count), 1)
+    size, extra = divmod(chunk_count, band_count)
+    bands = []
+    first_chunk = 0
+    for band in range(band_count):
+        count = size + (band < extra) # the first 'extra' bands take one more chunk
+        bands.append((first_chunk, count))
+        first_chunk += count
+    return bands
+
+
+def generate_bands(seed, chunk_count, width, rows, workers=1, terrain=None):
+    '''yields (first_chunk, blocks, surface_values) for every band of the first chunk_count chunks of a world.
+    With more than one worker the bands are generated in a process pool; since every chunk only depends on the
+    seed and its own coordinate the result is identical to generating serially'''
+    if workers <= 1:
+        for first_chunk, count in split_bands(chunk_count, SERIAL_BANDS):
+            blocks, surface_values = generate_band(seed, first_chunk, count, width, rows, terrain)
+            yield first_chunk, blocks, surface_values
+        return
+    bands = split_bands(chunk_count, workers * 4) # a few bands per worker keeps them all busy until the end
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(generate_band, *zip(*[(seed, first_chunk, count, width, rows, terrain)
+                                                 for first_chunk, count in bands]))
+        for (first_chunk, count), (blocks, surface_values) in zip(bands, results):
+            yield first_chunk, blocks, surface_values
@@ -0,0 +1,134 @@
+# contains the functions for calculating how brightly every block of the world is lit
+#
+# light levels go from 0 (dark) to MAX_LIGHT. Every block above the topmost solid block of its column is sky and
+# is fully lit, and light spreads from block to block losing the registry's falloff of the block it enters.
+# The whole light map is calculated once with NumPy, after that only the blocks around a changed block are
+# recalculated, flood filling from the sky and the unchanged light around them
+
+from collections import deque
+import numpy as np
+
+MAX_LIGHT = 15 # the light level of the sky
+
+
+def top_solid(mask, rows):
+    '''returns the row of the topmost solid block of a column from its solidity bitmask (rows if there is none)'''
+    if not mask:
+        return rows
+    return (mask & -mask).bit_length() - 1 # the lowest set bit
+
+
+def compute_light(blocks, solid, falloff):
+    '''returns the (rows, columns) uint8 light map of a 2D array of blocks.
+    solid and falloff are the registry's tag-indexed tables. Light only reaches MAX_LIGHT blocks below the sky,
+    so only the rows from the highest surface to MAX_LIGHT rows below the lowest one are spread through'''
+    rows = blocks.shape[0]
+    solid_blocks = solid[blocks]
+    sky = ~np.logical_or.accumulate(solid_blocks, axis=0) # True above the topmost solid block of each column
+    light = np.where(sky, MAX_LIGHT, 0).astype(np.uint8)
+    surfaces = sky.sum(axis=0) if blocks.size else np.zeros(1, dtype=np.int64) # topmost solid row per column
+    top = max(int(surfaces.min()) - 1, 0)
+    bottom = min(int(surfaces.max()) + MAX_LIGHT, rows)
+    if top >= bottom:
+        return light
+    band = light[top:bottom] # a view, so spreading through the band fills in the light map
+    cost = falloff[blocks[top:bottom]]
+    spread = np.empty_like(band)
+    for step in range(MAX_LIGHT):
+        before = band.copy()
+        for axis, forward in ((0, True), (0, False), (1, True), (1, False)):
+            # the light each block would get from its neighbour on one side, less the block's own falloff
+            spread.fill(0)
+            if axis == 0:
+                if forward:
+                    spread[1:] = band[:-1]
+                else:
+                    spread[:-1] = band[1:]
+            elif forward:
+                spread[:, 1:] = band[:, :-1]
+            else:
+                spread[:, :-1] = band[:, 1:]
+            np.maximum(spread, cost, out=spread) # saturating subtraction in uint8
+            spread -= cost
+            np.maximum(band, spread, out=band)
+        if np.array_equal(before, band): # nothing spread any further
+            break
+    return light
+
+
+def update_light_region(environment, top_row, left_col, bottom_row, right_col):
+    '''recalculates the light around the blocks in rows [top_row, bottom_row) and columns [left_col, right_col)
+    after some of them changed, and returns the number of blocks the flood fill visited.
+    No block further than MAX_LIGHT from a change (or from the part of a column that gained or lost the sky)
+    can depend on it, so only that window is recalculated, seeded from the sky and the light just outside it'''
+    rows, columns = environment.rows, environment.columns
+    falloff = environment.blocks.falloff
+    skies = [top_row, bottom_row] # the changed rows, and the old and new sky of every changed column
+    column_light = environment.get_light_region(0, left_col, rows, right_col)
+    for c in range(right_col - left_col):
+        lit = column_light[:, c] == MAX_LIGHT
+        skies.append(int(np.argmin(lit)) if not lit[-1] else rows)
+        skies.append(top_solid(environment.get_column_mask(left_col + c), rows))
+    top_row = max(min(skies) - MAX_LIGHT, 0)
+    bottom_row = min(max(skies) + MAX_LIGHT, rows)
+    left_col, right_col = max(left_col - MAX_LIGHT, 0), min(right_col + MAX_LIGHT, columns)
+    height, width = bottom_row - top_row, right_col - left_col
+
+    # the window, with a one block border of unchanged light around it to spread in from
+    outer_top, outer_left = max(top_row - 1, 0), max(left_col - 1, 0)
+    outer = environment.get_light_region(outer_top, outer_left, min(bottom_row + 1, rows),
+                                         min(right_col + 1, columns)).astype(np.int16)
+    inner_top, inner_left = top_row - outer_top, left_col - outer_left # where the window starts inside outer
+    old = outer[inner_top:inner_top + height, inner_left:inner_left + width]
+    cost = falloff[environment.get_region(top_row, left_col, bottom_row, right_col)].astype(np.int16)
+
+    sky_rows = np.array([top_solid(environment.get_column_mask(left_col + c), rows) for c in range(width)]) - top_row
+    sky = np.arange(height)[:, None] < sky_rows # True for the blocks of the window that are sky
+    light = np.where(sky, MAX_LIGHT, 0).astype(np.int16)
+    if top_row > 0: # light coming in from outside each edge of the window
+        np.maximum(light[0], outer[0, inner_left:inner_left + width] - cost[0], out=light[0])
+    if bottom_row < rows:
+        np.maximum(light[-1], outer[-1, inner_left:inner_left + width] - cost[-1], out=light[-1])
+    if left_col > 0:
+        np.maximum(light[:, 0], outer[inner_top:inner_top + height, 0] - cost[:, 0], out=light[:, 0])
+    if right_col < columns:
+        np.maximum(light[:, -1], outer[inner_top:inner_top + height, -1] - cost[:, -1], out=light[:, -1])
+
+    # only the sky next to blocks that aren't sky, and the blocks lit from outside, have any light to spread
+    enclosed = sky.copy()
+    enclosed[:-1] &= sky[1:]
+    enclosed[:, 1:] &= sky[:, :-1]
+    enclosed[:, :-1] &= sky[:, 1:]
+    seeds = (sky & ~enclosed) | (~sky & (light > 0))
+
+    # the flood fill runs on flat lists with a border of impassable blocks, so it needs no bounds checks
+    stride = width + 2
+    padded_light = np.zeros((height + 2, stride), dtype=np.int16)
+    padded_light[1:-1, 1:-1] = light
+    padded_cost = np.full((height + 2, stride), 255, dtype=np.int16)
+    padded_cost[1:-1, 1:-1] = cost
+    padded_seeds = np.zeros((height + 2, stride), dtype=bool)
+    padded_seeds[1:-1, 1:-1] = seeds
+    flat_light, flat_cost = padded_light.ravel().tolist(), padded_cost.ravel().tolist()
+    queue = deque(np.flatnonzero(padded_seeds).tolist())
+    offsets = (-stride, stride, -1, 1)
+    visited = 0
+    while queue: # every block that gets brighter spreads to its neighbours again
+        i = queue.popleft()
+        visited += 1
+        level = flat_light[i]
+        for offset in offsets:
+            n = i + offset
+            spread = level - flat_cost[n]
+            if spread > flat_light[n]:
+                flat_light[n] = spread
+                queue.append(n)
+
+    light = np.array(flat_light, dtype=np.uint8).reshape(height + 2, stride)[1:-1, 1:-1]
+    changed = np.nonzero(light != old)
+    if len(changed[0]):
+        environment.set_light_region(top_row, left_col, light)
+        environment.renderer.mark_region_dirty(top_row + int(changed[0].min()), left_col + int(changed[1].min()),
+                                               top_row + int(changed[0].max()) + 1,
+                                               left_col + int(changed[1].max()) + 1)
+    return visited
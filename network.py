@@ -0,0 +1,160 @@
+# contains the message format shared by the multiplayer server (server.py) and its clients, and the Game_Client class
+#
+# every message is a header (type, flags, payload length) followed by the payload. Payloads longer than
+# COMPRESS_SIZE are zlib compressed (and flagged in the header), so chunk snapshots go over the wire compressed
+#
+#   HELLO      client -> server  the player's name
+#   WELCOME    server -> client  the client's player id, the world's rows, its chunk width and the tick rate
+#   INPUT      client -> server  one action as a "command args..." line, like the lines of an action file
+#   CHUNK      server -> client  chunk_x and width, then every block of the chunk
+#   BLOCKS     server -> client  tick and count, then (column, row, tag) of each block changed in that tick
+#   POSITIONS  server -> client  tick and count, then (player id, x, y) of each player that moved in that tick
+#   LEAVE      server -> client  the id of a player that disconnected
+
+import asyncio
+import struct
+import zlib
+import numpy as np
+
+HELLO, WELCOME, INPUT, CHUNK, BLOCKS, POSITIONS, LEAVE = range(1, 8) # message types
+
+COMPRESSED = 1 # header flag set when the payload is zlib compressed
+COMPRESS_SIZE = 96 # payloads up to this many bytes are sent as they are
+CLIENT_PAYLOADS = {HELLO: 64, INPUT: 64} # the longest payload (bytes) the server accepts of each kind of message
+
+HEADER = struct.Struct("<BBI")
+WELCOME_INFO = struct.Struct("<IIIH")
+CHUNK_INFO = struct.Struct("<qI")
+TICK_COUNT = struct.Struct("<QI")
+BLOCK_CHANGE = np.dtype([("column", "<i8"), ("row", "<u4"), ("tag", "u1")])
+POSITION = np.dtype([("id", "<u4"), ("x", "<i4"), ("y", "<i4")])
+PLAYER_ID = struct.Struct("<I")
+
+
+def encode_message(kind, payload):
+    '''returns the bytes of a message of type kind, compressing the payload if that makes it smaller'''
+    flags = 0
+    if len(payload) > COMPRESS_SIZE:
+        compressed = zlib.compress(payload)
+        if len(compressed) < len(payload):
+            payload, flags = compressed, COMPRESSED
+    return HEADER.pack(kind, flags, len(payload)) + payload
+
+
+async def read_message(reader, max_payloads=None):
+    '''returns the next (kind, payload) message from an asyncio StreamReader, None once the connection closes.
+    With max_payloads ({kind : longest payload}, e.g. CLIENT_PAYLOADS) any other kind of message, or a longer
+    payload before or after decompressing, raises ValueError; a corrupt compressed payload raises zlib.error'''
+    try:
+        kind, flags, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+        limit = None if max_payloads is None else max_payloads.get(kind, -1)
+        if limit is not None and not 0 <= length <= limit: # checked before the payload is read into memory
+            raise ValueError("unexpected %d byte message of kind %d" % (length, kind))
+        payload = await reader.readexactly(length)
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    if flags & COMPRESSED:
+        if limit is None:
+            return kind, zlib.decompress(payload)
+        decompressor = zlib.decompressobj()
+        payload = decompressor.decompress(payload, limit)
+        if decompressor.unconsumed_tail: # it would decompress to more than limit bytes
+            raise ValueError("message of kind %d decompresses to more than %d bytes" % (kind, limit))
+    return kind, payload
+
+
+def encode_chunk(chunk_x, blocks):
+    '''returns the payload of a CHUNK message holding a (rows, width) array of blocks'''
+    return CHUNK_INFO.pack(chunk_x, blocks.shape[1]) + np.ascontiguousarray(blocks).tobytes()
+
+
+def decode_chunk(payload, rows):
+    '''returns the (chunk_x, blocks) of a CHUNK payload'''
+    chunk_x, width = CHUNK_INFO.unpack_from(payload)
+    blocks = np.frombuffer(payload, dtype=np.uint8, offset=CHUNK_INFO.size).reshape(rows, width).copy()
+    return chunk_x, blocks
+
+
+def encode_records(tick, records, dtype):
+    '''returns the payload of a BLOCKS or POSITIONS message from a list of tuples matching dtype'''
+    return TICK_COUNT.pack(tick, len(records)) + np.array(records, dtype=dtype).tobytes()
+
+
+def decode_records(payload, dtype):
+    '''returns the (tick, records) of a BLOCKS or POSITIONS payload, records as a NumPy structured array'''
+    tick, count = TICK_COUNT.unpack_from(payload)
+    return tick, np.frombuffer(payload, dtype=dtype, count=count, offset=TICK_COUNT.size)
+
+
+class Game_Client():
+    '''A class to connect to a Game_Server and keep a copy of the chunks and player positions it is sent.
+    It draws nothing, so it can be run headless (e.g. many at once by the load test in benchmark.py)'''
+
+    def __init__(self, name="player"):
+        self.name = name
+        self.reader = None
+        self.writer = None
+        self.player_id = None # the id the server gave this client's player
+        self.rows = 0 # the world's height and chunk width, sent by the server
+        self.chunk_width = 0
+        self.tick_rate = 0 # the number of ticks the server runs each second
+        self.chunks = {} # {chunk_x : 2D uint8 array of blocks} of every chunk received
+        self.positions = {} # {player id : (x, y)} of every player
+        self.last_tick = 0 # the last server tick a BLOCKS or POSITIONS message came from
+        self.bytes_received = 0
+
+    async def connect(self, host, port):
+        '''connects to the server and waits to be welcomed'''
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(encode_message(HELLO, self.name.encode("utf-8")))
+        kind, payload = await read_message(self.reader)
+        if kind != WELCOME:
+            raise ConnectionError("the server did not welcome %s" % self.name)
+        self.player_id, self.rows, self.chunk_width, self.tick_rate = WELCOME_INFO.unpack(payload)
+
+    def send_action(self, command, args=()):
+        '''sends one of the commands in controls.COMMANDS (e.g. "left", "aim") to the server'''
+        line = " ".join([command] + [str(arg) for arg in args])
+        self.writer.write(encode_message(INPUT, line.encode("ascii")))
+
+    async def receive(self):
+        '''handles every message from the server until the connection closes'''
+        while True:
+            message = await read_message(self.reader)
+            if message is None:
+                return
+            self.bytes_received += HEADER.size + len(message[1]) # (counted after decompressing)
+            self.handle(*message)
+
+    def handle(self, kind, payload):
+        '''applies one message from the server to the client's copy of the world'''
+        if kind == CHUNK:
+            chunk_x, blocks = decode_chunk(payload, self.rows)
+            self.chunks[chunk_x] = blocks
+        elif kind == BLOCKS:
+            self.last_tick, changes = decode_records(payload, BLOCK_CHANGE)
+            for column, row, tag in changes.tolist():
+                chunk = self.chunks.get(column // self.chunk_width)
+                if chunk is not None:
+                    chunk[row, column % self.chunk_width] = tag
+        elif kind == POSITIONS:
+            self.last_tick, positions = decode_records(payload, POSITION)
+            for player_id, x, y in positions.tolist():
+                self.positions[player_id] = (x, y)
+        elif kind == LEAVE:
+            self.positions.pop(PLAYER_ID.unpack(payload)[0], None)
+
+    def get_block(self, row, column):
+        '''returns the tag of the block at (row, column), None if its chunk hasn't been received'''
+        chunk = self.chunks.get(column // self.chunk_width)
+        if chunk is None:
+            return None
+        return chunk[row, column % self.chunk_width]
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
@@ -0,0 +1,102 @@
+# contains the Frame_Profiler class, which records how long each phase of every frame takes
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class Frame_Profiler():
+    '''A class to record per-phase timings (ms) and counters of the last 'size' frames in a ring buffer.
+    A disabled profiler records nothing, so it can be left in the game loop at almost no cost'''
+
+    def __init__(self, size=900, enabled=True):
+        self.enabled = enabled
+        self.frames = deque(maxlen=size) # one dictionary {"phase or counter" : value} per frame, oldest first
+        self.current = None # the dictionary of the frame being recorded
+        self.frame_start = 0
+        self.names = [] # every phase / counter name seen, in the order they were first recorded
+        self.counters = set() # the names that are counters rather than timed phases
+
+    def begin_frame(self):
+        '''starts recording a new frame'''
+        if self.enabled:
+            self.current = {}
+            self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        '''finishes the current frame, recording its total time as "frame"'''
+        if self.enabled and self.current is not None:
+            self.record("frame", (time.perf_counter() - self.frame_start) * 1000)
+            self.frames.append(self.current)
+            self.current = None
+
+    def record(self, name, value):
+        '''adds value to the phase or counter 'name' of the current frame'''
+        if name not in self.names:
+            self.names.append(name)
+        self.current[name] = self.current.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name):
+        '''times the code inside a "with profiler.phase(name):" block'''
+        if not self.enabled or self.current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+
+    def count(self, name, value):
+        '''records a counter (e.g. draw calls) for the current frame'''
+        if self.enabled and self.current is not None:
+            self.counters.add(name)
+            self.record(name, value)
+
+    def percentile(self, name, percent):
+        '''returns the given percentile of 'name' over the recorded frames, 0 if it was never recorded'''
+        values = sorted(frame.get(name, 0) for frame in self.frames)
+        if not values:
+            return 0
+        return values[min(int(len(values) * percent / 100), len(values) - 1)]
+
+    def get_lines(self, fps):
+        '''returns the lines of text shown by the overlay'''
+        lines = ["FPS %.1f" % fps]
+        last = self.frames[-1] if self.frames else {}
+        for name in self.names:
+            if name in self.counters:
+                lines.append("%-8s %d" % (name, last.get(name, 0)))
+            else:
+                lines.append("%-8s p50 %6.2f ms  p99 %6.2f ms" % (name, self.percentile(name, 50),
+                                                                   self.percentile(name, 99)))
+        return lines
+
+    def draw_overlay(self, screen, font, fps):
+        '''draws FPS, the p50 / p99 time of every phase and the last frame's counters in the top right corner.
+        Returns the screen rect it covers (None when disabled)'''
+        if not self.enabled:
+            return None
+        lines = [font.render(line, False, (255, 255, 255)) for line in self.get_lines(fps)]
+        width = max(line.get_width() for line in lines) + 10
+        top = 5
+        area = screen.fill((0, 0, 0), (screen.get_width() - width - 5, top, width,
+                                       sum(line.get_height() for line in lines)))
+        for line in lines:
+            screen.blit(line, (screen.get_width() - width, top))
+            top += line.get_height()
+        return area
+
+    def dump(self, path):
+        '''writes every recorded frame to path, as JSON if it ends in ".json" and as CSV otherwise'''
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump(list(self.frames), file)
+            return
+        with open(path, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=self.names, restval=0)
+            writer.writeheader()
+            writer.writerows(self.frames)
@@ -0,0 +1,137 @@
+# contains the classes and functions for drawing the environment through cached chunk surfaces
+
+import pygame
+import numpy as np
+from lighting import MAX_LIGHT
+
+
+class Chunk_Renderer():
+    '''A class to draw the environment from pre-rendered chunk surfaces.
+    The world is split into square chunks of 'chunk_size' blocks, each chunk is drawn once onto its own surface
+    and only re-drawn when one of its blocks (or their light) changes. Chunks with no light at all are never
+    rendered, they are filled black instead'''
+
+    def __init__(self, environment, chunk_size=16, cache_limit=256):
+        self.environment = environment
+        self.chunk_size = chunk_size # the side length (blocks) of a chunk
+        self.chunk_px = chunk_size * environment.game_settings.block_size # the side length (pixels) of a chunk
+        self.surfaces = {} # dictionary {(chunk_row, chunk_col) : Surface} of every rendered chunk, None if it's dark
+        self.dirty = set() # set of (chunk_row, chunk_col) keys that need to be re-rendered before the next draw
+        self.changed = None # when a list, world rects (pixels) of the blocks changed are added to it until
+                            # take_changed is called (only the game loop wants them, headless worlds leave it None)
+        self.cache_limit = cache_limit # the most chunk surfaces kept before off-screen ones are thrown away
+        self.chunks_rendered = 0 # number of chunk surfaces rendered since creation (useful for profiling)
+        self.frame_renders = 0 # number of chunk surfaces rendered by the last draw
+        self.frame_blits = 0 # number of chunk surfaces blitted by the last draw
+        self.frame_tiles = 0 # number of blocks covered by the chunks blitted by the last draw
+        self.frame_dark = 0 # number of dark chunks filled (rather than blitted) by the last draw
+
+    def chunk_of(self, row, column):
+        '''returns the (chunk_row, chunk_col) key of the chunk holding the block at (row, column)'''
+        return row // self.chunk_size, column // self.chunk_size
+
+    def mark_dirty(self, row, column):
+        '''flags the chunk holding the block at (row, column) to be re-rendered'''
+        self.dirty.add(self.chunk_of(row, column))
+        if self.changed is None:
+            return
+        blck_sz = self.environment.game_settings.block_size
+        self.changed.append(pygame.Rect(column * blck_sz, row * blck_sz, blck_sz, blck_sz))
+
+    def mark_region_dirty(self, top_row, left_col, bottom_row, right_col):
+        '''flags every chunk overlapping rows [top_row, bottom_row) and columns [left_col, right_col) to be
+        re-rendered'''
+        for chunk_row in range(top_row // self.chunk_size, (bottom_row - 1) // self.chunk_size + 1):
+            for chunk_col in range(left_col // self.chunk_size, (right_col - 1) // self.chunk_size + 1):
+                self.dirty.add((chunk_row, chunk_col))
+        if self.changed is None:
+            return
+        blck_sz = self.environment.game_settings.block_size
+        self.changed.append(pygame.Rect(left_col * blck_sz, top_row * blck_sz, (right_col - left_col) * blck_sz,
+                                        (bottom_row - top_row) * blck_sz))
+
+    def take_changed(self):
+        '''returns and forgets the world rects of the blocks changed since the last call (none if they aren't
+        being recorded)'''
+        if self.changed is None:
+            return []
+        changed, self.changed = self.changed, []
+        return changed
+
+    def invalidate(self):
+        '''throws away every cached chunk so that the whole world is re-rendered on the next draw'''
+        self.surfaces.clear()
+        self.dirty.clear()
+
+    def chunk_keys(self, view):
+        '''returns every (chunk_row, chunk_col) key of the world overlapping view, a rect in world pixels'''
+        rows, columns = self.environment.rows, self.environment.columns
+        blck_sz = self.environment.game_settings.block_size
+        top, left = view.top // blck_sz, view.left // blck_sz
+        bottom, right = -(-view.bottom // blck_sz), -(-view.right // blck_sz) # ceiling division
+        first_row, first_col = max(top, 0) // self.chunk_size, max(left, 0) // self.chunk_size
+        last_row = -(-min(bottom, rows) // self.chunk_size) # ceiling division
+        last_col = -(-min(right, columns) // self.chunk_size)
+        return [(chunk_row, chunk_col) for chunk_row in range(first_row, last_row)
+                for chunk_col in range(first_col, last_col)]
+
+    def chunk_rect(self, key):
+        '''returns the size of chunk 'key' on screen as a rect at (0, 0), smaller than chunk_px if it hangs off the
+        bottom or right of the world'''
+        blck_sz = self.environment.game_settings.block_size
+        rows = min(self.chunk_size, self.environment.rows - key[0] * self.chunk_size)
+        columns = min(self.chunk_size, self.environment.columns - key[1] * self.chunk_size)
+        return pygame.Rect(0, 0, columns * blck_sz, rows * blck_sz)
+
+    def render_chunk(self, key):
+        '''draws every block of the chunk 'key' onto its cached surface'''
+        blck_sz = self.environment.game_settings.block_size
+        start_row, start_col = key[0] * self.chunk_size, key[1] * self.chunk_size
+        blocks = self.environment.get_region(start_row, start_col, start_row + self.chunk_size, start_col + self.chunk_size)
+        light = self.environment.get_light_region(start_row, start_col, start_row + self.chunk_size,
+                                                  start_col + self.chunk_size)
+        self.chunks_rendered += 1
+        if not light.any(): # nothing to see, so skip the rendering and fill it black when it's drawn
+            self.surfaces[key] = None
+            return
+        pixels = self.environment.palette[blocks.T] # (width, height, 3) array of one pixel per block
+        if (light != MAX_LIGHT).any(): # darken each block by its light level
+            pixels = (pixels.astype(np.uint16) * light.T[:, :, None] // MAX_LIGHT).astype(np.uint8)
+        small = pygame.surfarray.make_surface(pixels)
+        surface = pygame.transform.scale(small, (pixels.shape[0] * blck_sz, pixels.shape[1] * blck_sz))
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert() # matching the display format makes blitting much cheaper
+        self.surfaces[key] = surface
+
+    def draw(self, screen, camera, area=None):
+        '''re-renders any changed chunks and blits every chunk the camera can see to the screen.
+        If area (a screen rect) is given, only the chunks overlapping it are blitted'''
+        rendered = self.chunks_rendered
+        for key in self.dirty: # re-render only chunks whose blocks have changed
+            if key in self.surfaces:
+                self.render_chunk(key)
+        self.dirty.clear()
+        if area is None:
+            visible = self.chunk_keys(camera.rect)
+        else:
+            visible = self.chunk_keys(area.move(camera.rect.topleft))
+        blits = []
+        dark = 0
+        for key in visible:
+            if key not in self.surfaces: # first time this chunk is drawn
+                self.render_chunk(key)
+            position = (key[1] * self.chunk_px - camera.rect.left, key[0] * self.chunk_px - camera.rect.top)
+            if self.surfaces[key] is None:
+                screen.fill((0, 0, 0), self.chunk_rect(key).move(position))
+                dark += 1
+            else:
+                blits.append((self.surfaces[key], position))
+        screen.blits(blits, False)
+        self.frame_renders = self.chunks_rendered - rendered
+        self.frame_blits = len(blits)
+        self.frame_dark = dark
+        self.frame_tiles = len(blits) * self.chunk_size * self.chunk_size
+        if area is None and len(self.surfaces) > self.cache_limit: # forget chunks that have scrolled off the screen
+            visible = set(visible)
+            for key in [key for key in self.surfaces if key not in visible]:
+                del self.surfaces[key]
@@ -0,0 +1,232 @@
+# contains the Game_Server class, which runs the authoritative world for any number of networked players
+#
+# the server owns the environment and every player. Clients only send input (see network.py); each tick the
+# server applies it, steps the world and sends every client: a compressed snapshot of each chunk near its player
+# the first time it comes into range, the blocks that changed in chunks it already has, and the positions of the
+# players that moved, batched into one message
+#
+# run "python server.py [port] [seed]" to host an endless world
+
+import sys
+import time
+import asyncio
+import zlib
+import game_settings as gs
+import environment as env
+import simulation
+from player import Player
+from controls import COMMAND_ARGS, apply_action
+from profiler import Frame_Profiler
+from network import (read_message, encode_message, encode_chunk, encode_records, HELLO, WELCOME, INPUT, CHUNK,
+                     BLOCKS, POSITIONS, LEAVE, WELCOME_INFO, BLOCK_CHANGE, POSITION, PLAYER_ID, CLIENT_PAYLOADS)
+
+WORLD_DIMENSIONS = (120, 2000) # an endless world only uses the rows
+BLOCK_DIMENSIONS = 10
+TICK_RATE = 20 # ticks per second
+CHUNK_HEADROOM = 32 # chunks kept loaded on top of the ones around every player, so walking doesn't evict
+PORT = 25575
+
+
+class Client_Connection():
+    '''A class to hold what the server knows about one connected client'''
+
+    def __init__(self, player_id, player, writer):
+        self.player_id = player_id
+        self.player = player
+        self.writer = writer
+        self.actions = [] # (command, args) received since the last tick, applied at the start of the next one
+        self.sent_chunks = set() # chunk_x of every chunk snapshot sent, only changes are sent for these after
+        self.snapshot_bytes = 0 # bytes sent as chunk snapshots
+        self.update_bytes = 0 # bytes sent as block changes, positions and everything else
+        self.new = True # True until the client has been sent every player's position
+
+
+class Game_Server():
+    '''A class to run one environment for every connected client at a fixed tick rate'''
+
+    def __init__(self, environment, tick_rate=TICK_RATE, chunk_radius=None):
+        self.environment = environment
+        environment.change_log = [] # the blocks changed each tick, sent to the clients that have their chunks
+        self.tick_rate = tick_rate
+        self.chunk_radius = chunk_radius if chunk_radius is not None else environment.game_settings.load_radius
+        self.base_chunks = environment.game_settings.max_loaded_chunks # the chunk budget with no one connected
+        self.clients = {} # {player id : Client_Connection}
+        self.positions = {} # {player id : (x, y)} of every player as last sent
+        self.next_id = 1
+        self.tick = 0
+        self.server = None
+        self.profiler = Frame_Profiler(size=3600) # "simulate" and "send" times and the bytes sent each tick
+
+    async def start(self, host="127.0.0.1", port=0):
+        '''starts accepting clients and returns the port (port 0 picks a free one)'''
+        self.server = await asyncio.start_server(self.handle_client, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        '''welcomes a new client, then queues its input until it disconnects or sends a malformed message'''
+        try:
+            message = await read_message(reader, CLIENT_PAYLOADS)
+        except (ValueError, zlib.error):
+            message = None
+        if message is None or message[0] != HELLO:
+            writer.close()
+            return
+        player_id = self.next_id
+        self.next_id += 1
+        client = Client_Connection(player_id, Player(self.environment.screen), writer)
+        self.clients[player_id] = client
+        self.fit_chunk_budget()
+        self.send(client, WELCOME, WELCOME_INFO.pack(player_id, self.environment.rows,
+                                                     self.environment.chunk_width, self.tick_rate))
+        try:
+            while True:
+                message = await read_message(reader, CLIENT_PAYLOADS)
+                if message is None:
+                    break
+                kind, payload = message
+                if kind == INPUT:
+                    fields = payload.decode("ascii").split()
+                    # unknown commands and ones with the wrong number of arguments are ignored rather than trusted
+                    if fields and COMMAND_ARGS.get(fields[0]) == len(fields) - 1:
+                        client.actions.append((fields[0], tuple(int(arg) for arg in fields[1:])))
+        except (ValueError, zlib.error): # a malformed message (UnicodeDecodeError is a ValueError), drop the client
+            pass
+        finally:
+            del self.clients[player_id]
+            self.fit_chunk_budget()
+            self.positions.pop(player_id, None)
+            for other in self.clients.values():
+                self.send(other, LEAVE, PLAYER_ID.pack(player_id))
+            writer.close()
+
+    def fit_chunk_budget(self):
+        '''makes the environment keep every client's chunks loaded (the chunks around each player are used every
+        tick, so with too small a budget players far apart would evict and regenerate each other's every tick)'''
+        settings = self.environment.game_settings
+        radius = max(settings.load_radius, self.chunk_radius)
+        settings.max_loaded_chunks = max(self.base_chunks, len(self.clients) * (2 * radius + 1) + CHUNK_HEADROOM)
+
+    def send(self, client, kind, payload):
+        '''sends one message to a client, returns the number of bytes sent'''
+        return self.send_bytes(client, encode_message(kind, payload))
+
+    def send_bytes(self, client, message, snapshot=False):
+        '''sends an already encoded message to a client, returns the number of bytes sent'''
+        if client.writer.is_closing():
+            return 0
+        client.writer.write(message)
+        if snapshot:
+            client.snapshot_bytes += len(message)
+        else:
+            client.update_bytes += len(message)
+        return len(message)
+
+    def step(self):
+        '''runs one tick: applies every client's input, advances the world and sends the clients what changed'''
+        environment = self.environment
+        self.profiler.begin_frame()
+        clients = list(self.clients.values())
+        with self.profiler.phase("simulate"):
+            for client in clients:
+                for command, args in client.actions:
+                    apply_action(client.player, command, args)
+                client.actions.clear()
+                environment.load_around(client.player.rect.centerx)
+                client.player.update(environment)
+            environment.block_updates.tick()
+            changes, environment.change_log = environment.change_log, []
+        with self.profiler.phase("send"):
+            sent = self.send_changes(clients, changes) + self.send_positions(clients) + self.send_chunks(clients)
+        self.profiler.count("bytes", sent)
+        self.profiler.count("clients", len(clients))
+        self.profiler.end_frame()
+        self.tick += 1
+
+    def send_changes(self, clients, changes):
+        '''sends each client the changed blocks that are in chunks it has been sent'''
+        if not changes:
+            return 0
+        by_chunk = {} # {chunk_x : [(column, row, tag), ...]}, so each client's message is a few list joins
+        for row, column, tag in changes:
+            by_chunk.setdefault(column // self.environment.chunk_width, []).append((column, row, tag))
+        sent = 0
+        for client in clients:
+            records = [record for chunk_x in by_chunk if chunk_x in client.sent_chunks for record in by_chunk[chunk_x]]
+            if records:
+                sent += self.send(client, BLOCKS, encode_records(self.tick, records, BLOCK_CHANGE))
+        return sent
+
+    def send_positions(self, clients):
+        '''sends every client the players that moved this tick (every player, to clients that just joined)'''
+        moved = []
+        for client in clients:
+            position = client.player.rect.topleft
+            if self.positions.get(client.player_id) != position:
+                self.positions[client.player_id] = position
+                moved.append((client.player_id,) + position)
+        sent = 0
+        if moved: # encoded once for everyone
+            message = encode_message(POSITIONS, encode_records(self.tick, moved, POSITION))
+            sent += sum(self.send_bytes(client, message) for client in clients if not client.new)
+        everyone = [(player_id,) + position for player_id, position in self.positions.items()]
+        for client in clients:
+            if client.new:
+                sent += self.send(client, POSITIONS, encode_records(self.tick, everyone, POSITION))
+                client.new = False
+        return sent
+
+    def send_chunks(self, clients):
+        '''sends every client a snapshot of the chunks that just came within chunk_radius of its player'''
+        environment = self.environment
+        snapshots = {} # {chunk_x : encoded message}, so a chunk several clients reach at once is compressed once
+        chunk_count = -(-environment.columns // environment.chunk_width)
+        sent = 0
+        for client in clients:
+            center = client.player.rect.centerx // (environment.chunk_width * environment.game_settings.block_size)
+            for chunk_x in range(max(center - self.chunk_radius, 0), min(center + self.chunk_radius + 1, chunk_count)):
+                if chunk_x in client.sent_chunks:
+                    continue
+                message = snapshots.get(chunk_x)
+                if message is None:
+                    left = chunk_x * environment.chunk_width
+                    blocks = environment.get_region(0, left, environment.rows, left + environment.chunk_width)
+                    message = snapshots[chunk_x] = encode_message(CHUNK, encode_chunk(chunk_x, blocks))
+                sent += self.send_bytes(client, message, snapshot=True)
+                client.sent_chunks.add(chunk_x)
+        return sent
+
+    async def run(self, ticks=None):
+        '''steps the world tick_rate times a second, for the given number of ticks or forever'''
+        interval = 1 / self.tick_rate
+        next_tick = time.perf_counter()
+        while ticks is None or self.tick < ticks:
+            self.step()
+            next_tick += interval
+            await asyncio.sleep(max(next_tick - time.perf_counter(), 0)) # also lets the clients' input in
+            if time.perf_counter() - next_tick > interval: # fell behind, skip the ticks rather than rush them
+                next_tick = time.perf_counter()
+
+    async def close(self):
+        '''stops accepting clients and disconnects the connected ones'''
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for client in list(self.clients.values()):
+            client.writer.close()
+
+
+def make_server_environment(seed=None, **settings):
+    '''creates the headless endless environment a server runs'''
+    game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, WORLD_DIMENSIONS, gs.BLOCK_COLORS, seed=seed, **settings)
+    return simulation.make_headless_environment(game_settings, environment_class=env.Chunked_Environment)
+
+
+async def serve(port, seed):
+    server = Game_Server(make_server_environment(seed))
+    port = await server.start("0.0.0.0", port)
+    print("serving seed %d on port %d" % (server.environment.seed, port))
+    await server.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(serve(int(sys.argv[1]) if len(sys.argv) > 1 else PORT, int(sys.argv[2]) if len(sys.argv) > 2 else None))
@@ -0,0 +1,48 @@
+# contains the classes and functions for running the game without a display, driven by scripted or recorded
+# action streams (see controls.py)
+
+import time
+import pygame
+import environment as env
+from player import Player
+from controls import Action_Stream, apply_action
+
+TIMESTEP = 1 / 30 # the game time (seconds) that passes in one tick, matching the 30 FPS of the real game
+
+
+def make_headless_environment(game_settings, screen_size=(1400, 800), environment_class=env.Environment):
+    '''creates and generates an environment drawing onto an off-screen surface, so no display is needed'''
+    environment = environment_class(pygame.Surface(screen_size), game_settings)
+    environment.create_environment()
+    return environment
+
+
+class Simulation():
+    '''A class to step the player through an environment at a fixed timestep with no rendering or sleeping'''
+
+    def __init__(self, environment, player=None, actions=()):
+        self.environment = environment
+        self.player = player if player is not None else Player(environment.screen)
+        self.actions = Action_Stream(actions) # the scripted / recorded input, consumed tick by tick
+        self.tick = 0 # number of ticks simulated so far
+
+    def get_time(self):
+        '''returns the game time (seconds) simulated so far'''
+        return self.tick * TIMESTEP
+
+    def step(self):
+        '''applies this tick's actions and advances the world by one tick'''
+        for tick, command, args in self.actions.take(self.tick):
+            apply_action(self.player, command, args)
+        self.environment.load_around(self.player.rect.centerx)
+        self.player.update(self.environment)
+        self.environment.block_updates.tick()
+        self.tick += 1
+
+    def run(self, ticks):
+        '''simulates the given number of ticks and returns how many ticks per second (real time) were simulated'''
+        start = time.perf_counter()
+        for i in range(ticks):
+            self.step()
+        elapsed = time.perf_counter() - start
+        return ticks / elapsed if elapsed else float("inf")
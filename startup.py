@@ -0,0 +1,79 @@
+# contains the functions and classes for starting the game quickly
+#
+# nothing is initialized when a module is imported: the display is only started by init_display, fonts are only
+# started by fonts.get_font and sound is never started, so tools, the server and the benchmarks can import the
+# game's modules without opening a window or an audio device. The world is created on a World_Loader thread while
+# the window shows a loading screen, so the first frame appears straight away
+
+import threading
+import pygame
+import fonts
+
+LOADING_COLOR = (230, 230, 230)
+BAR_SIZE = (400, 20) # the size (pixels) of the loading screen's progress bar
+
+
+def init_display(size, caption=None):
+    '''starts the display (only the first time it is called) and returns a window of the given size'''
+    if not pygame.display.get_init():
+        pygame.display.init()
+    window = pygame.display.get_surface()
+    if window is None or window.get_size() != tuple(size):
+        window = pygame.display.set_mode(size)
+    if caption is not None:
+        pygame.display.set_caption(caption)
+    return window
+
+
+def draw_loading_screen(window, progress, text="Generating world"):
+    '''draws the loading screen with a progress bar filled to progress (0 to 1) and shows it'''
+    window.fill((0, 0, 0))
+    bar = pygame.Rect((0, 0), BAR_SIZE)
+    bar.center = window.get_rect().center
+    message = fonts.render_text("Arial", 25, "%s... %d%%" % (text, progress * 100), LOADING_COLOR)
+    window.blit(message, message.get_rect(midbottom=(bar.centerx, bar.top - 10)))
+    pygame.draw.rect(window, LOADING_COLOR, bar, 1)
+    pygame.draw.rect(window, LOADING_COLOR, (bar.left, bar.top, int(bar.width * progress), bar.height))
+    pygame.display.flip()
+
+
+class World_Loader():
+    '''A class to run a slow start up function (e.g. creating the world) on a background thread.
+    The function is passed a progress(done, total) callback, and its result is collected with get_result'''
+
+    def __init__(self, load):
+        self.load = load
+        self.progress = 0.0 # the fraction of the work done so far, from 0 to 1
+        self.result = None
+        self.error = None # the exception the function raised, re-raised by get_result
+        self.thread = threading.Thread(target=self.run, daemon=True) # don't keep a closed game alive
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.result = self.load(self.report)
+        except BaseException as error:
+            self.error = error
+        self.progress = 1.0
+
+    def report(self, done, total):
+        '''the progress callback handed to the start up function'''
+        self.progress = done / total if total else 1.0
+
+    def is_done(self):
+        return not self.thread.is_alive()
+
+    def wait(self, timeout):
+        '''waits up to timeout seconds for the function to finish, returns True if it has'''
+        self.thread.join(timeout)
+        return self.is_done()
+
+    def get_result(self):
+        '''waits for the function to finish and returns what it returned'''
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.result
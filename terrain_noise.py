@@ -0,0 +1,85 @@
+# contains the functions that compute seeded value noise over whole rows / grids of blocks at once with NumPy
+#
+# the noise is a lattice of random values, one per corner of a grid of 'scale' sized cells, smoothly interpolated
+# in between. Each lattice value is a hash of the seed and the corner's world coordinate, so any range of columns
+# gives exactly the same values no matter which chunk or band it is generated in
+
+import numpy as np
+
+MULTIPLIER_X = np.uint64(0x9E3779B97F4A7C15) # large odd constants that spread the coordinates over 64 bits
+MULTIPLIER_Y = np.uint64(0xC2B2AE3D27D4EB4F)
+MIX_1 = np.uint64(0xBF58476D1CE4E5B9) # the splitmix64 finalizer constants
+MIX_2 = np.uint64(0x94D049BB133111EB)
+
+
+def lattice_values(key, ix, iy):
+    '''returns the random value in [0, 1) of every lattice corner (ix, iy) for the 64 bit key.
+    ix and iy are integer arrays that are broadcast against each other'''
+    h = (ix.astype(np.uint64) * MULTIPLIER_X) ^ (iy.astype(np.uint64) * MULTIPLIER_Y)
+    h ^= np.uint64(key & 0xFFFFFFFFFFFFFFFF)
+    h ^= h >> np.uint64(30)
+    h *= MIX_1
+    h ^= h >> np.uint64(27)
+    h *= MIX_2
+    h ^= h >> np.uint64(31)
+    return (h >> np.uint64(40)).astype(np.float32) / np.float32(1 << 24) # the top 24 bits fit a float32 exactly
+
+
+def cell_positions(start, count, scale):
+    '''returns the lattice cell (int64) of each of count coordinates from start, and the smoothed (float32)
+    position of each coordinate within its cell'''
+    position = np.arange(start, start + count) / scale
+    cell = np.floor(position).astype(np.int64)
+    t = (position - cell).astype(np.float32)
+    return cell, t * t * (3 - 2 * t) # smoothstep, so the noise has no creases at the lattice corners
+
+
+def value_noise_1d(key, left, width, scale):
+    '''returns the noise (float32 in [0, 1)) of the width columns from left, with lattice corners every scale columns'''
+    cell, t = cell_positions(left, width, scale)
+    corners = lattice_values(key, np.arange(cell[0], cell[-1] + 2), np.zeros(1, dtype=np.int64))
+    i = cell - cell[0]
+    return corners[i] + (corners[i + 1] - corners[i]) * t
+
+
+def value_noise_2d(key, left, width, rows, scale):
+    '''returns the (rows, width) noise (float32 in [0, 1)) of the width columns from left.
+    Only the lattice corners are hashed; the blocks in between are interpolated along x, then along y'''
+    column_cell, t = cell_positions(left, width, scale)
+    row_cell, u = cell_positions(0, rows, scale)
+    corners = lattice_values(key, np.arange(column_cell[0], column_cell[-1] + 2)[None, :],
+                             np.arange(0, row_cell[-1] + 2)[:, None]) # (lattice rows, lattice columns)
+    i = column_cell - column_cell[0]
+    across = corners[:, i] + (corners[:, i + 1] - corners[:, i]) * t # (lattice rows, width)
+    top, noise = across[row_cell], across[row_cell + 1]
+    noise -= top # interpolated in place, these arrays are the size of the whole region
+    noise *= u[:, None]
+    noise += top
+    return noise
+
+
+def fractal_noise_1d(key, left, width, scale, octaves, persistence=0.5):
+    '''returns octaves layers of 1D noise, each at half the scale and 'persistence' times the weight of the last,
+    normalised back to [0, 1)'''
+    total = np.zeros(width, dtype=np.float32)
+    weight, weights = 1.0, 0.0
+    for octave in range(octaves):
+        total += weight * value_noise_1d(key + octave, left, width, scale / 2 ** octave)
+        weights += weight
+        weight *= persistence
+    return total / weights
+
+
+def fractal_noise_2d(key, left, width, rows, scale, octaves, persistence=0.5):
+    '''returns octaves layers of 2D noise, each at half the scale and 'persistence' times the weight of the last,
+    normalised back to [0, 1)'''
+    total = np.zeros((rows, width), dtype=np.float32)
+    weight, weights = 1.0, 0.0
+    for octave in range(octaves):
+        layer = value_noise_2d(key + octave, left, width, rows, scale / 2 ** octave)
+        layer *= weight
+        total += layer
+        weights += weight
+        weight *= persistence
+    total /= weights
+    return total
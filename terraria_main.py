@@ -1,83 +1,186 @@
 # the main file of the game
 
+import time
+START_TIME = time.perf_counter() # start up is timed from here, before anything else is imported
+
 import pygame
+import os
 import sys
 import environment as env
 import game_settings as gs
+import world_file
+import fonts
+import startup
 from player import Player
+from entities import Entity_Store, MOB
+from profiler import Frame_Profiler
+from dirty_rects import Dirty_Rects
+from controls import Input_Handler, Action_Stream, GAME_COMMANDS, apply_action, read_actions, write_actions
 
-pygame.init()
-window = pygame.display.set_mode((1400, 800))
-pygame.display.set_caption("Minecraft 2D")
+window = startup.init_display((1400, 800), "Minecraft 2D") # only the display, the game has no sound
 clock = pygame.time.Clock()
 
-# rendering messages and fonts
-font = pygame.font.SysFont("Arial", 25) # sets a Font object
-greeting_msg = font.render("Press 'Q' to exit the game", False, (230, 230, 230))
-greeting_msg_rect = greeting_msg.get_rect(topleft=(0, 0))
+WORLD_DIMENSIONS = (120, 2000)
 
-# Inventory screen
-font = pygame.font.SysFont("Arial", 40)
-game_over_msg = font.render("INVENTORY", False, (230, 230, 230))
-game_over_msg_rect = greeting_msg.get_rect(midbottom=(700, 300))
+BLOCK_DIMENSIONS = 10
 
-WORLD_DIMENSIONS = (80, 140)
+BLOCK_COLORS = gs.BLOCK_COLORS
 
-BLOCK_DIMENSIONS = 10
+ENDLESS_WORLD = True # generate the world a chunk at a time as the player explores it
+
+SAVE_PATH = "world.sav" # the world is loaded from here on start up and saved here on exit
+
+# set TERRARIA_RECORD to a file name to record the session's input there, or TERRARIA_REPLAY to play a recorded
+# session back. Both start from a new world created from SESSION_SEED (and don't touch the save) so replays match
+RECORD_PATH = os.environ.get("TERRARIA_RECORD")
+REPLAY_PATH = os.environ.get("TERRARIA_REPLAY")
+SESSION_SEED = 0
 
-BLOCK_COLORS = {"BACKGROUND" : (0, 150, 230), "DIRT" : (165, 42, 42), "STONE" : (128, 128, 128),
-                "COAL" : (0, 0, 0), "IRON" : (128, 0, 0), "DIAMOND" : (0, 255, 255),
-                "WOOD" : (181, 101, 29), "LEAF" : (0, 255, 0)}
+MOB_COUNT = 5 # the number of mobs spawned around the player on start up
+
+DIRTY_RECTS = True # only redraw and push the parts of the window that changed while the camera stands still
+
+# set TERRARIA_PROFILE to a file name (e.g. "trace.csv" or "trace.json") to show the profiler overlay
+# and write every frame's timings to that file on exit
+PROFILE_PATH = os.environ.get("TERRARIA_PROFILE")
+profiler = Frame_Profiler(enabled=bool(PROFILE_PATH))
+profiler_font = fonts.get_font("Courier New", 14) if profiler.enabled else None
+
+# set TERRARIA_STARTUP to print how long start up took, to the first frame and until the world was ready
+STARTUP_TIMES = bool(os.environ.get("TERRARIA_STARTUP"))
 
 
 # Initializing the game
 game_settings = gs.Game_Settings(BLOCK_DIMENSIONS, WORLD_DIMENSIONS, BLOCK_COLORS)
-environment = env.Environment(window, game_settings)
-environment.create_environment()
-player = Player(window)
+SAVING = not (RECORD_PATH or REPLAY_PATH)
+if not SAVING:
+    game_settings.seed = SESSION_SEED
+
+
+def load_game(progress):
+    '''loads the saved world or creates a new one, returning (environment, player).
+    Runs on a World_Loader thread while the loading screen is shown'''
+    if SAVING and os.path.exists(SAVE_PATH):
+        return world_file.load_world(SAVE_PATH, window, game_settings)
+    if ENDLESS_WORLD:
+        environment = env.Chunked_Environment(window, game_settings)
+    else:
+        environment = env.Environment(window, game_settings)
+    environment.create_environment(progress)
+    return environment, Player(window)
+
+
+loader = startup.World_Loader(load_game).start()
+startup.draw_loading_screen(window, loader.progress)
+first_frame_time = time.perf_counter()
+while not loader.wait(1 / 30): # stops waiting as soon as the world is ready
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT: # nothing to save yet
+            sys.exit()
+    startup.draw_loading_screen(window, loader.progress)
+environment, player = loader.get_result()
+environment.renderer.changed = [] # record the blocks that change, so only they are redrawn
+if STARTUP_TIMES:
+    print("first frame %.1f ms, world ready %.1f ms" % ((first_frame_time - START_TIME) * 1000,
+                                                        (time.perf_counter() - START_TIME) * 1000))
+entities = Entity_Store()
+for i in range(MOB_COUNT):
+    entities.spawn(MOB, player.rect.x + (i + 1) * 150, 0, direction=1 if i % 2 else -1)
+
+
+def quit_game():
+    '''saves the world (or the recorded input) and exits the game'''
+    if SAVING:
+        world_file.save_world(SAVE_PATH, environment, player)
+    if RECORD_PATH:
+        write_actions(RECORD_PATH, recording)
+    if profiler.enabled:
+        profiler.dump(PROFILE_PATH)
+    sys.exit()
+
 
 # global to be used in while loop
 menu = False
+display_updates = Dirty_Rects(window.get_rect())
+last_drawn = [] # the screen rects the player, entities and overlay covered last frame
+controls = Input_Handler()
+recording = [] # every player action so far, written to RECORD_PATH on exit
+replay = Action_Stream(read_actions(REPLAY_PATH)) if REPLAY_PATH else None
+tick = 0 # the number of game frames played, actions are timestamped with it
 
 while True:
+    menu_redraw = True # the panel has to be drawn over the game once each time the menu opens
     while menu:
-        player.display_inventory(environment)
-        pygame.display.flip()
+        if player.display_inventory(environment, menu_redraw): # only flip when something was drawn
+            pygame.display.flip()
+        menu_redraw = False
+        clock.tick(30)
 
-        for event in pygame.event.get():
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_q:
-                    sys.exit()
-                if event.key == pygame.K_p:
-                    menu = False
+        for action_tick, command, args in controls.handle_events(pygame.event.get(), tick):
+            if command == "quit":
+                quit_game()
+            if command == "menu":
+                menu = False
+                display_updates.mark_full() # the panel is drawn over the game
 
-    for event in pygame.event.get():
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            player.breaking = True
-        if event.type == pygame.MOUSEBUTTONUP:
-            player.breaking = False
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_q:
-                sys.exit()
-            if event.key == pygame.K_a:
-                player.left = True
-            if event.key == pygame.K_d:
-                player.right = True
-            if event.key == pygame.K_SPACE:
-                player.jump()
-            if event.key == pygame.K_p:
+    profiler.begin_frame()
+    with profiler.phase("events"):
+        actions = controls.handle_events(pygame.event.get(), tick)
+        aim = controls.handle_aim(environment.camera, tick)
+        if aim is not None:
+            actions.append(aim)
+        if replay is not None: # the recorded actions replace the player's live input
+            actions = [action for action in actions if action[1] in GAME_COMMANDS] + replay.take(tick)
+            if replay.is_finished():
+                actions.append((tick, "quit", ()))
+        for action in actions:
+            action_tick, command, args = action
+            if command == "quit":
+                quit_game()
+            elif command == "menu":
                 menu = True
-        if event.type == pygame.KEYUP:
-            if event.key == pygame.K_a:
-                player.left = False
-            if event.key == pygame.K_d:
-                player.right = False
-        elif event.type == pygame.QUIT:
-            sys.exit()
+            else:
+                apply_action(player, command, args)
+                recording.append(action)
 
-    window.fill(BLOCK_COLORS["BACKGROUND"])
-    environment.draw_environment()
-    player.update(environment)
-    player.draw(window)
-    pygame.display.flip()
+    with profiler.phase("update"):
+        environment.load_around(player.rect.centerx)
+        player.update(environment)
+        entities.update(environment)
+        environment.block_updates.tick()
+    with profiler.phase("draw"):
+        camera_position = environment.camera.rect.topleft
+        environment.camera.follow(player.rect)
+        if not DIRTY_RECTS or environment.camera.rect.topleft != camera_position: # everything on screen moved
+            display_updates.mark_full()
+        for rect in environment.renderer.take_changed(): # mined blocks
+            display_updates.add(environment.camera.apply(rect))
+        for rect in last_drawn: # where the player, entities and overlay were
+            display_updates.add(rect)
+        if display_updates.is_full():
+            window.fill(BLOCK_COLORS["BACKGROUND"])
+            environment.draw_environment()
+        else:
+            for rect in display_updates.rects: # restore the world underneath only the changed regions
+                window.set_clip(rect)
+                window.fill(BLOCK_COLORS["BACKGROUND"])
+                environment.draw_environment(rect)
+            window.set_clip(None)
+        last_drawn = entities.draw(window, environment, environment.camera)
+        last_drawn.append(player.draw(window, environment.camera))
+    profiler.count("blits", environment.renderer.frame_blits)
+    profiler.count("renders", environment.renderer.frame_renders)
+    profiler.count("tiles", environment.renderer.frame_tiles)
+    profiler.count("dark", environment.renderer.frame_dark)
+    profiler.count("entities", entities.count)
+    profiler.count("blocks", environment.block_updates.last_updates)
+    overlay = profiler.draw_overlay(window, profiler_font, clock.get_fps())
+    if overlay is not None:
+        last_drawn.append(overlay)
+    for rect in last_drawn:
+        display_updates.add(rect)
+    with profiler.phase("flip"):
+        display_updates.present()
+    profiler.end_frame()
     clock.tick(30)
+    tick += 1
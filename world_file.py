@@ -0,0 +1,164 @@
+# contains the classes and functions for saving and loading worlds in the game's binary save format
+#
+# layout (all numbers little-endian):
+#   header    magic "TWLD", version, flags, rows, columns, chunk_width, seed, chunk count
+#   player    x, y, xvel (unused), yvel, inventory size, then (name length, name, count) for each inventory entry
+#   index     (chunk_x, offset, length) for each saved chunk
+#   chunks    each chunk's blocks (rows * chunk_width bytes) followed by its surface values, zlib compressed
+#
+# endless worlds only save chunks that differ from what the seed generates, finite worlds save every chunk.
+# Which generator made the world is saved in the flags, its other terrain settings have to match when it is loaded
+
+import os
+import mmap
+import struct
+import zlib
+import numpy as np
+import environment as env
+from player import Player
+
+MAGIC = b"TWLD"
+VERSION = 1
+ENDLESS_FLAG = 1 # set in the header flags when the world is a Chunked_Environment
+NOISE_FLAG = 2 # set when the world was generated by the noise generator rather than the random walk one
+
+HEADER = struct.Struct("<4sHHIIIQI")
+PLAYER = struct.Struct("<iiffH")
+INVENTORY_ENTRY = struct.Struct("<B") # the length of the block name, followed by the name and COUNT
+COUNT = struct.Struct("<I")
+INDEX_ENTRY = struct.Struct("<qQI")
+
+
+class World_File():
+    '''A class to read a saved world through a memory map, so chunks are only read from disk when they are used'''
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.flags, self.rows, self.columns, self.chunk_width, self.seed, chunk_count = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC:
+            raise ValueError("%s is not a saved world" % path)
+        if version != VERSION:
+            raise ValueError("%s was saved with unsupported version %d" % (path, version))
+        self.endless = bool(self.flags & ENDLESS_FLAG)
+
+        offset = HEADER.size
+        self.player_x, self.player_y, self.xvel, self.yvel, inventory_size = PLAYER.unpack_from(self.map, offset)
+        offset += PLAYER.size
+        self.inventory = {}
+        for i in range(inventory_size):
+            name_length = INVENTORY_ENTRY.unpack_from(self.map, offset)[0]
+            offset += INVENTORY_ENTRY.size
+            name = self.map[offset:offset + name_length].decode("ascii")
+            offset += name_length
+            self.inventory[name] = COUNT.unpack_from(self.map, offset)[0]
+            offset += COUNT.size
+
+        self.index = {} # {chunk_x : (offset, length)} of every chunk in the file
+        for i in range(chunk_count):
+            chunk_x, chunk_offset, length = INDEX_ENTRY.unpack_from(self.map, offset)
+            self.index[chunk_x] = (chunk_offset, length)
+            offset += INDEX_ENTRY.size
+
+    def read_chunk(self, chunk_x):
+        '''returns the saved (blocks, surface_values) arrays of chunk chunk_x, or None if it wasn't saved'''
+        if chunk_x not in self.index:
+            return None
+        offset, length = self.index[chunk_x]
+        data = zlib.decompress(self.map[offset:offset + length]) # only these pages of the file are read
+        split = self.rows * self.chunk_width
+        blocks = np.frombuffer(data, dtype=np.uint8, count=split).reshape(self.rows, self.chunk_width).copy()
+        surface_values = np.frombuffer(data, dtype=np.int32, offset=split).copy()
+        return blocks, surface_values
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def pack_chunk(blocks, surface_values):
+    '''returns the compressed bytes of one chunk'''
+    return zlib.compress(blocks.tobytes() + surface_values.astype(np.int32).tobytes())
+
+
+def saved_chunks(environment):
+    '''returns a list of (chunk_x, compressed bytes) of every chunk that has to be saved'''
+    width = environment.chunk_width
+    chunks = []
+    if isinstance(environment, env.Chunked_Environment):
+        chunk_xs = set(environment.stored) | {chunk_x for chunk_x, chunk in environment.chunks.items() if chunk.modified}
+        if environment.world_file is not None: # chunks loaded from the save that haven't been touched since
+            chunk_xs |= set(environment.world_file.index)
+        for chunk_x in sorted(chunk_xs):
+            chunk = environment.get_chunk(chunk_x)
+            chunks.append((chunk_x, pack_chunk(chunk.blocks, chunk.surface_values)))
+        return chunks
+    for chunk_x in range(-(-environment.columns // width)): # ceiling division
+        left = chunk_x * width
+        blocks = np.zeros((environment.rows, width), dtype=np.uint8) # padded if it hangs off the edge of the world
+        surface_values = np.zeros(width, dtype=np.int32)
+        blocks[:, :environment.columns - left] = environment.num_env[:, left:left + width]
+        surface_values[:environment.columns - left] = environment.surface_values[left:left + width]
+        chunks.append((chunk_x, pack_chunk(blocks, surface_values)))
+    return chunks
+
+
+def save_world(path, environment, player):
+    '''saves the environment and the player's position, velocity and inventory to path'''
+    endless = isinstance(environment, env.Chunked_Environment)
+    chunks = saved_chunks(environment)
+    flags = (ENDLESS_FLAG if endless else 0) | (NOISE_FLAG if environment.terrain.generator == "noise" else 0)
+    parts = [HEADER.pack(MAGIC, VERSION, flags, environment.rows,
+                         0 if endless else environment.columns, environment.chunk_width, environment.seed, len(chunks)),
+             PLAYER.pack(player.rect.x, player.rect.y, player.xvel, player.yvel, len(player.inventory))]
+    for name, count in player.inventory.items():
+        name = name.encode("ascii")
+        parts += [INVENTORY_ENTRY.pack(len(name)), name, COUNT.pack(count)]
+    offset = sum(len(part) for part in parts) + INDEX_ENTRY.size * len(chunks) # where the first chunk starts
+    for chunk_x, data in chunks:
+        parts.append(INDEX_ENTRY.pack(chunk_x, offset, len(data)))
+        offset += len(data)
+    parts += [data for chunk_x, data in chunks]
+    with open(path + ".tmp", "wb") as file:
+        file.write(b"".join(parts))
+    old_file = environment.world_file if endless else None
+    reopen = old_file is not None and os.path.abspath(old_file.path) == os.path.abspath(path)
+    if reopen: # every chunk it held has been read into chunks above, and an open file can't be replaced on Windows
+        old_file.close()
+    os.replace(path + ".tmp", path)
+    if reopen: # untouched chunks are read lazily from the new file from now on
+        environment.world_file = World_File(path)
+
+
+def load_world(path, screen, game_settings):
+    '''loads a saved world, returning its (environment, player).
+    The world's size and seed in game_settings are replaced by the saved ones'''
+    world_file = World_File(path)
+    game_settings.seed = world_file.seed
+    game_settings.chunk_width = world_file.chunk_width
+    game_settings.terrain.generator = "noise" if world_file.flags & NOISE_FLAG else "walk"
+    if world_file.endless:
+        game_settings.block_dimensions = (world_file.rows, game_settings.block_dimensions[1])
+        environment = env.Chunked_Environment(screen, game_settings)
+        environment.world_file = world_file # chunks are read from the file as the player reaches them
+    else:
+        game_settings.block_dimensions = (world_file.rows, world_file.columns)
+        environment = env.Environment(screen, game_settings)
+        width = world_file.chunk_width
+        for chunk_x in world_file.index:
+            blocks, surface_values = world_file.read_chunk(chunk_x)
+            left = chunk_x * width
+            right = min(left + width, environment.columns)
+            environment.num_env[:, left:right] = blocks[:, :right - left]
+            environment.surface_values[left:right] = surface_values[:right - left]
+        environment.refresh()
+        world_file.close()
+
+    player = Player(screen)
+    player.rect.topleft = (world_file.player_x, world_file.player_y)
+    player.yvel = world_file.yvel # xvel is a class constant, its slot is only kept so older saves still load
+    player.inventory = world_file.inventory
+    environment.load_around(player.rect.centerx)
+    return environment, player